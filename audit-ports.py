@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+audit-ports.py - Verify that the SHA512 of every historical port version still matches GitHub.
+
+This script walks every git-tree in every versions file and reads the historical portfile.cmake
+straight from the git object database. Parsed portfiles are kept in the '.port-index.json' metadata
+index, so each historical portfile is only read and parsed once.
+
+Each unique (REPO, REF) pair is downloaded once, with a bounded number of concurrent downloads, and
+hashed in a process pool. Downloads are kept in a download directory only written by this script,
+so an interrupted audit does not download them again.
+
+Verified archives are recorded in a state file, so an interrupted audit resumes where it stopped
+and later audits only check versions that have not been verified yet. Only archives downloaded from
+GitHub (or --mirror) count as verified. Mismatches are never recorded and are checked again on the
+next run.
+
+An existing local cache, e.g. the vcpkg downloads directory, can be given with --cache-dir. Archives
+found there are hashed instead of downloaded, which finds mismatches quickly, but a match only says
+the cached copy is intact. They are never recorded as verified and never modified.
+
+Usage:
+    python audit-ports.py [--downloads <count>] [--download-dir <directory>] [--cache-dir <directory>] [--mirror <url>] [--report <file>]
+
+Requirements:
+    - Python 3.7+
+    - 'requests' module (install with pip if missing)
+    - Requires git in PATH
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, List, Dict, Tuple
+try:
+    import requests
+except ImportError:
+    print("Error: The 'requests' module is required. Install it with 'pip install requests'.")
+    exit(1)
+
+from util.util import get_sha512_from_file, load_versions_files
+from util.git import get_object_hashes, read_git_objects
+from util.port_index import load_index, save_index, update_index
+
+AUDIT_STATE_FILE = ".audit-state.json"
+# Seconds to wait for the connection and for each read, so a stalled download can not hang the audit
+DOWNLOAD_TIMEOUT = 60
+
+def collect_archives(jobs: int) -> Dict[Tuple[str, str], Dict]:
+    """
+    Collect every archive referenced by a historical port version.
+    Returns a dict keyed by (REPO, REF) with the expected SHA512 and the port versions using it.
+    """
+    trees: Dict[str, List[str]] = {}
+    for portname, data in load_versions_files().items():
+        for version_entry in data.get("versions", []):
+            label = f"{portname} {version_entry.get('version')}#{version_entry.get('port-version', 0)}"
+            trees.setdefault(version_entry["git-tree"], []).append(label)
+
+    # Only portfiles not already in the metadata index are read and parsed
+    blob_hashes = get_object_hashes([f"{tree}:portfile.cmake" for tree in trees])
+    index = load_index()
+    missing = [blob_hash for blob_hash in blob_hashes.values() if blob_hash and blob_hash not in index]
+    if update_index(index, {blob_hash: content for blob_hash, content in read_git_objects(missing).items() if content is not None}, jobs):
+        save_index(index)
+
+    archives: Dict[Tuple[str, str], Dict] = {}
+    for tree, labels in trees.items():
+        blob_hash = blob_hashes[f"{tree}:portfile.cmake"]
+        if blob_hash is None or index.get(blob_hash) is None:
+            print(f"Warning: No readable portfile.cmake in git-tree {tree} ({', '.join(labels)}), skip")
+            continue
+        for call in index[blob_hash]:
+            arguments = {keyword: argument["value"] for keyword, argument in call["arguments"].items()}
+            if call["function"] != "vcpkg_from_github" or not all(keyword in arguments for keyword in ["REPO", "REF", "SHA512"]):
+                continue
+            archive = archives.setdefault((arguments["REPO"], arguments["REF"]), {"expected": set(), "versions": []})
+            archive["expected"].add(arguments["SHA512"])
+            archive["versions"].extend(labels)
+    return archives
+
+def get_archive_file_name(repo_name: str, ref: str) -> str:
+    """Get the file name vcpkg_from_github uses for a downloaded archive."""
+    return f"{repo_name.replace('/', '-')}-{ref.replace('/', '-')}.tar.gz"
+
+def download_archive(repo_name: str, ref: str, download_dir: str, cache_dir: Optional[str], mirror: str) -> Tuple[str, str]:
+    """
+    Find an archive in the cache directory or download it into the download directory, unless it was already downloaded.
+    Returns the file path and where it came from, "cache" or "download".
+    """
+    file_name = get_archive_file_name(repo_name, ref)
+    if cache_dir and os.path.isfile(os.path.join(cache_dir, file_name)):
+        return os.path.join(cache_dir, file_name), "cache"
+    file_path = os.path.join(download_dir, file_name)
+    if os.path.isfile(file_path):
+        return file_path, "download"
+
+    url = f"{mirror.rstrip('/')}/{repo_name}/archive/{ref}.tar.gz"
+    response = requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    with tempfile.NamedTemporaryFile(dir=download_dir, delete=False) as f:
+        try:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, file_path)
+    return file_path, "download"
+
+def load_state(state_file: str) -> Dict[str, str]:
+    if not os.path.isfile(state_file):
+        return {}
+    with open(state_file, "r") as f:
+        return json.load(f).get("verified", {})
+
+def save_state(state_file: str, verified: Dict[str, str]) -> None:
+    temp_file = f"{state_file}.tmp"
+    with open(temp_file, "w", newline='\n') as f:
+        json.dump({"verified": verified}, f, indent=2, sort_keys=True)
+    os.replace(temp_file, state_file)
+
+def audit_ports(downloads: int, hashers: int, download_dir: str, cache_dir: Optional[str], mirror: str, state_file: str) -> Tuple[List[Dict], int]:
+    """
+    Audit all archives that have not been verified yet.
+    Returns the list of mismatches and the number of archives that could not be checked.
+    """
+    archives = collect_archives(hashers)
+    verified = load_state(state_file)
+    pending = {key: archive for key, archive in archives.items()
+               if verified.get(f"{key[0]}@{key[1]}") not in archive["expected"] or len(archive["expected"]) > 1}
+    print(f"Found {len(archives)} archives, {len(archives) - len(pending)} already verified, {len(pending)} to check.")
+
+    os.makedirs(download_dir, exist_ok=True)
+    mismatches: List[Dict] = []
+    failures = 0
+    cache_only = 0
+    with ThreadPoolExecutor(max_workers=downloads) as download_executor, ProcessPoolExecutor(max_workers=hashers) as hash_executor:
+        download_futures = {download_executor.submit(download_archive, repo_name, ref, download_dir, cache_dir, mirror): (repo_name, ref)
+                            for repo_name, ref in pending}
+        hash_futures: Dict[Future, Tuple[str, str]] = {}
+        archive_files: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        # Handle downloads and hashes as they finish, so verified archives are saved right away
+        running = set(download_futures)
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in download_futures:
+                    key = download_futures[future]
+                    try:
+                        archive_files[key] = future.result()
+                    except (requests.RequestException, OSError) as e:
+                        print(f"Error downloading {key[0]} {key[1]}: {e}")
+                        failures += 1
+                        continue
+                    hash_future = hash_executor.submit(get_sha512_from_file, archive_files[key][0])
+                    hash_futures[hash_future] = key
+                    running.add(hash_future)
+                    continue
+
+                repo_name, ref = hash_futures[future]
+                archive = pending[(repo_name, ref)]
+                try:
+                    actual = future.result()
+                except OSError as e:
+                    print(f"Error hashing {repo_name} {ref}: {e}")
+                    failures += 1
+                    continue
+                file_path, source = archive_files[(repo_name, ref)]
+                for expected in sorted(archive["expected"]):
+                    if expected != actual:
+                        mismatches.append({
+                            "repo": repo_name,
+                            "ref": ref,
+                            "expected": expected,
+                            "actual": actual,
+                            "source": source,
+                            "versions": archive["versions"],
+                        })
+                if source == "cache":
+                    # A cached copy did not come from upstream in this audit, a match is never recorded as verified
+                    if archive["expected"] == {actual}:
+                        cache_only += 1
+                elif archive["expected"] == {actual}:
+                    verified[f"{repo_name}@{ref}"] = actual
+                    save_state(state_file, verified)
+                else:
+                    # Download it again next time, the archive may be fixed upstream
+                    os.remove(file_path)
+
+    if cache_only:
+        print(f"{cache_only} archives only matched their copy in '{cache_dir}' and were not verified against upstream.")
+    return mismatches, failures
+
+def print_report(mismatches: List[Dict]) -> None:
+    if not mismatches:
+        print("All checked archives match their pinned SHA512.")
+        return
+    print(f"Found {len(mismatches)} SHA512 mismatches:")
+    for mismatch in mismatches:
+        cached = " (cached copy)" if mismatch["source"] == "cache" else ""
+        print(f"  {mismatch['repo']} {mismatch['ref']}{cached} ({', '.join(mismatch['versions'])})")
+        print(f"    expected: {mismatch['expected']}")
+        print(f"    actual:   {mismatch['actual']}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify the SHA512 of every historical port version")
+    parser.add_argument("-d", "--downloads", type=int, default=4, help="Number of concurrent downloads")
+    parser.add_argument("--hashers", type=int, default=os.cpu_count() or 2, help="Number of processes hashing archives")
+    parser.add_argument("--download-dir", default=os.path.join(tempfile.gettempdir(), "mw-vcpkg-registry-audit"), help="Directory only used by the audit for downloaded archives, reused between runs")
+    parser.add_argument("--cache-dir", help="Existing archive cache to read from, e.g. the vcpkg downloads directory. Read only, matches are not recorded as verified")
+    parser.add_argument("--mirror", default="https://github.com", help="Base URL serving '<owner>/<repo>/archive/<ref>.tar.gz'")
+    parser.add_argument("--state", default=AUDIT_STATE_FILE, help="File recording already verified archives")
+    parser.add_argument("--report", help="Write the mismatches as JSON to this file")
+    args = parser.parse_args()
+
+    mismatches, failures = audit_ports(args.downloads, args.hashers, args.download_dir, args.cache_dir, args.mirror, args.state)
+    print_report(mismatches)
+    if args.report:
+        with open(args.report, "w", newline='\n') as f:
+            json.dump(mismatches, f, indent=2)
+        print(f"Wrote report to '{args.report}'.")
+    if failures:
+        print(f"Error: {failures} archives could not be checked, run the audit again to resume.")
+    if mismatches or failures:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
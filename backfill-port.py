@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+backfill-port.py - Import the upstream release history of a port in one batch.
+
+This script takes a port and a list of upstream tags or commits. All refs are resolved to commits
+with a single 'git ls-remote', then for every commit it concurrently downloads the archive to
+compute the SHA512 and reads the version from the upstream vcpkg.json. The portfile.cmake and
+vcpkg.json of each version are written directly as git objects, based on the files of
+'ports/<portname>' committed at HEAD, without touching the working tree.
+
+The complete versions file and baseline are then written in a single commit. The historical port
+trees are kept reachable through a separate chain of commits, holding only 'ports/<portname>',
+that is merged by that commit. They are pushed together with the registry without showing up in
+the history of the port on the main branch.
+
+Usage:
+    python backfill-port.py --port <portname> <tag-or-commit> [<tag-or-commit> ...]
+
+Requirements:
+    - Python 3.7+
+    - 'requests' and 'packaging' modules (install with pip if missing)
+    - Requires git in PATH
+    - No staged changes and no uncommitted changes to the port are allowed, if so the script will abort.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple
+try:
+    import requests
+except ImportError:
+    print("Error: The 'requests' module is required. Install it with 'pip install requests'.")
+    exit(1)
+try:
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    print("Error: The 'packaging' module is required. Install it with 'pip install packaging'.")
+    exit(1)
+
+from util.util import get_sha512_from_github, get_or_create_baseline, get_versions_file_path, render_vcpkg_json
+from util.git import list_tree, make_tree, replace_subtree, write_blob
+from util.cmake import get_source_calls, set_source_arguments
+
+GITHUB_URL = "https://github.com"
+
+def resolve_refs(repo_name: str, refs: List[str]) -> Optional[Dict[str, str]]:
+    """
+    Resolve tags, branches or commits of a GitHub repository to commit hashes with a single 'git ls-remote'.
+    A ref that is not a tag or branch is used as is if it is a full commit hash. Returns None on failure.
+    """
+    url = f"{GITHUB_URL}/{repo_name}"
+    try:
+        result = subprocess.run(["git", "ls-remote", "--tags", "--heads", url], capture_output=True, text=True, check=True,
+                                env=dict(os.environ, GIT_TERMINAL_PROMPT="0"))
+    except subprocess.CalledProcessError as e:
+        print(f"Error listing the refs of {url}: {e.stderr.strip()}")
+        return None
+    remote_refs: Dict[str, str] = {}
+    for line in result.stdout.splitlines():
+        object_hash, name = line.split("\t", 1)
+        remote_refs[name] = object_hash
+
+    commits: Dict[str, str] = {}
+    for ref in refs:
+        # Annotated tags are listed twice, the '^{}' entry is the commit the tag points to
+        for name in [f"refs/tags/{ref}^{{}}", f"refs/tags/{ref}", f"refs/heads/{ref}", f"{ref}^{{}}", ref]:
+            if name in remote_refs:
+                commits[ref] = remote_refs[name]
+                break
+        else:
+            if re.fullmatch(r"[0-9a-f]{40}", ref):
+                commits[ref] = ref
+    unresolved = [ref for ref in refs if ref not in commits]
+    if unresolved:
+        print(f"Error: Not a tag, branch or full commit hash in {repo_name}: {', '.join(unresolved)}")
+        return None
+    return commits
+
+def get_remote_vcpkg_json(repo_name: str, commit_hash: str) -> Optional[Dict]:
+    url = f"https://raw.githubusercontent.com/{repo_name}/{commit_hash}/vcpkg.json"
+    try:
+        response = requests.get(url)
+        response.raise_for_status()
+        data = response.json()
+        if not isinstance(data.get("version"), str) or not data["version"].strip():
+            raise ValueError(f"Error: GitHub 'vcpkg.json' for {repo_name} at {commit_hash} is missing a valid 'version' field.")
+        return data
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching or validating vcpkg.json from GitHub: {e}")
+        return None
+
+def build_port_version(portname: str, source_call: Dict, ref: str, commit_hash: str, port_tree: str, port_files: Dict[str, str], vcpkg_data: Dict) -> Optional[Dict]:
+    """
+    Fetch everything needed for one upstream commit and write the port tree for it.
+    Returns the new version entry, or None on failure.
+    """
+    repo_name = source_call["arguments"]["REPO"]["value"]
+    sha512 = get_sha512_from_github(repo_name, commit_hash)
+    if not sha512:
+        return None
+    remote_vcpkg_data = get_remote_vcpkg_json(repo_name, commit_hash)
+    if remote_vcpkg_data is None:
+        return None
+
+    new_vcpkg_data = dict(vcpkg_data)
+    new_vcpkg_data["version"] = remote_vcpkg_data["version"].strip()
+    new_vcpkg_data["port-version"] = remote_vcpkg_data.get("port-version", 0)
+    for field in ["description", "homepage", "license"]:
+        if field in remote_vcpkg_data and remote_vcpkg_data[field]:
+            new_vcpkg_data[field] = remote_vcpkg_data[field]
+    vcpkg_json = render_vcpkg_json(new_vcpkg_data)
+    if vcpkg_json is None:
+        print(f"Error formatting vcpkg.json for {portname} at '{ref}'.")
+        return None
+    portfile = set_source_arguments(port_files["portfile.cmake"], source_call, {"REF": commit_hash, "SHA512": sha512})
+
+    replaced = {
+        "portfile.cmake": write_blob(portfile.encode()),
+        "vcpkg.json": write_blob(vcpkg_json.encode()),
+    }
+    entries = [(mode, object_type, replaced.get(name, object_hash), name) for mode, object_type, object_hash, name in list_tree(port_tree)]
+    print(f"Prepared {portname} {remote_vcpkg_data['version']} from '{ref}' ({commit_hash}).")
+    return {
+        "ref": ref,
+        "git-tree": make_tree(entries),
+        "version": remote_vcpkg_data["version"].strip(),
+        "port-version": remote_vcpkg_data.get("port-version", 0),
+    }
+
+def merge_version_entries(portname: str, existing: List[Dict], new_entries: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Merge new version entries into the existing ones, ordered from the newest to the oldest version.
+    Returns None if two different git-trees claim the same version and port-version.
+    """
+    by_version: Dict[Tuple[str, int], Dict] = {}
+    for entry in existing + new_entries:
+        key = (entry["version"], entry.get("port-version", 0))
+        if key in by_version:
+            if by_version[key]["git-tree"] != entry["git-tree"]:
+                print(f"Error: Version '{key[0]}' port-version {key[1]} of '{portname}' already exists with a different git-tree"
+                      f" (refs: {by_version[key].get('ref', 'existing')}, {entry.get('ref', 'existing')}).")
+                return None
+            continue
+        by_version[key] = entry
+
+    try:
+        ordered = sorted(by_version.items(), key=lambda item: (Version(item[0][0]), item[0][1]), reverse=True)
+    except InvalidVersion as e:
+        print(f"Error: Invalid version format for '{portname}': {e}")
+        return None
+    return [{"git-tree": entry["git-tree"], "version": version, "port-version": port_version} for (version, port_version), entry in ordered]
+
+def commit_tree(tree: str, parents: List[str], message: str) -> str:
+    command = ["git", "commit-tree", tree, "-m", message]
+    for parent in parents:
+        command += ["-p", parent]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def backfill_port(portname: str, refs: List[str], jobs: int) -> bool:
+    port_path = os.path.join("ports", portname)
+    portfile_path = os.path.join(port_path, "portfile.cmake")
+
+    # The port committed at HEAD is the template for every historical version
+    port_files: Dict[str, str] = {}
+    try:
+        result = subprocess.run(["git", "diff", "--cached", "--name-only"], capture_output=True, text=True, check=True)
+        if result.stdout.strip():
+            print("Error: There are already staged files. Aborting.")
+            return False
+        result = subprocess.run(["git", "status", "--porcelain", "--", port_path], capture_output=True, text=True, check=True)
+        if result.stdout.strip():
+            print(f"Error: Port '{portname}' has uncommitted changes, commit them first. Aborting.")
+            return False
+        head = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        port_tree = subprocess.run(["git", "rev-parse", f"HEAD:ports/{portname}"], capture_output=True, text=True, check=True).stdout.strip()
+        for name in ["portfile.cmake", "vcpkg.json"]:
+            result = subprocess.run(["git", "show", f"{port_tree}:{name}"], capture_output=True, text=True, check=True)
+            port_files[name] = result.stdout
+    except subprocess.CalledProcessError as e:
+        print(f"Error: Port '{portname}' must have a committed 'portfile.cmake' and 'vcpkg.json' in '{port_path}': {e.stderr.strip()}")
+        return False
+    vcpkg_data = json.loads(port_files["vcpkg.json"])
+
+    try:
+        calls = [call for call in get_source_calls(port_files["portfile.cmake"]) if call["function"] == "vcpkg_from_github"]
+    except ValueError as e:
+        print(f"Error parsing '{portfile_path}': {e}")
+        return False
+    if len(calls) != 1 or not all(keyword in calls[0]["arguments"] for keyword in ["REPO", "REF", "SHA512"]):
+        print(f"Error: Expected one vcpkg_from_github call with REPO, REF and SHA512 in '{portfile_path}'.")
+        return False
+    commits = resolve_refs(calls[0]["arguments"]["REPO"]["value"], refs)
+    if commits is None:
+        return False
+
+    # Network and object writes run concurrently, one task per upstream ref
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        new_entries = list(executor.map(lambda ref: build_port_version(portname, calls[0], ref, commits[ref], port_tree, port_files, vcpkg_data), refs))
+    if not all(new_entries):
+        print(f"Error: Failed to prepare {sum(1 for entry in new_entries if entry is None)} of {len(refs)} refs.")
+        return False
+
+    json_file = get_versions_file_path(portname)
+    existing: List[Dict] = []
+    if os.path.isfile(json_file):
+        with open(json_file, "r") as f:
+            existing = json.load(f).get("versions", [])
+    versions = merge_version_entries(portname, existing, new_entries)
+    if versions is None:
+        return False
+    existing_trees = {entry["git-tree"] for entry in existing}
+    added = [entry for entry in new_entries if entry["git-tree"] not in existing_trees]
+    if not added:
+        print(f"All refs are already in '{json_file}', nothing to do.")
+        return True
+
+    # Decide on the baseline before anything is written
+    baseline_file, baseline_data = get_or_create_baseline()
+    latest = versions[0]
+    current = baseline_data["default"].get(portname)
+    try:
+        update_baseline = current is None or (Version(latest["version"]), latest["port-version"]) > (Version(current["baseline"]), current.get("port-version", 0))
+    except InvalidVersion as e:
+        print(f"Error: Invalid baseline version format for '{portname}': {e}")
+        return False
+
+    # Keep each historical port tree reachable through a chain of commits holding only 'ports/<portname>'.
+    # The chain has no connection to HEAD, so the history of the port on the main branch is not affected.
+    try:
+        empty_tree = make_tree([])
+        history: Optional[str] = None
+        for entry in sorted(added, key=lambda entry: (Version(entry["version"]), entry["port-version"])):
+            root_tree = replace_subtree(empty_tree, f"ports/{portname}", entry["git-tree"])
+            history = commit_tree(root_tree, [history] if history else [], f"Port tree for {portname} {entry['version']}#{entry['port-version']} ({entry['ref']})")
+    except subprocess.CalledProcessError as e:
+        print(f"Error writing history commits for {portname}: {e}")
+        return False
+
+    os.makedirs(os.path.dirname(json_file), exist_ok=True)
+    with open(json_file, "w", newline='\n') as f:
+        json.dump({"versions": versions}, f, indent=2)
+    print(f"Updated '{json_file}' with {len(added)} new versions.")
+
+    if update_baseline:
+        baseline_data["default"][portname] = {
+            "baseline": latest["version"],
+            "port-version": latest["port-version"]
+        }
+        with open(baseline_file, "w", newline='\n') as f:
+            json.dump(baseline_data, f, indent=2)
+        print(f"Updated 'baseline.json' for port '{portname}' with version: {latest['version']}.")
+
+    # Commit the versions files on top of HEAD, with the history chain as second parent
+    try:
+        subprocess.run(["git", "add", json_file, baseline_file], check=True)
+        tree = subprocess.run(["git", "write-tree"], capture_output=True, text=True, check=True).stdout.strip()
+        message = f"Backfilled {len(added)} version{'s' if len(added) > 1 else ''} of {portname}"
+        commit = commit_tree(tree, [head, history], message)
+        subprocess.run(["git", "update-ref", "-m", f"backfill: {message}", "HEAD", commit, head], check=True)
+        print(f"Committed backfill for {portname}.")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"Error committing backfill for {portname}: {e}")
+        return False
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import the upstream release history of a vcpkg port in one batch")
+    parser.add_argument("--port", required=True, help="Name of the port to backfill")
+    parser.add_argument("refs", nargs="+", help="Upstream tags or commits to import")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of refs to fetch concurrently")
+    args = parser.parse_args()
+
+    if backfill_port(args.port, args.refs, args.jobs):
+        print(f"Successfully backfilled port: {args.port}")
+    else:
+        print(f"Failed to backfill port: {args.port}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+diff-registry.py - Show what changed in the registry between two commits.
+
+This script compares 'versions/baseline.json' and the versions files of two registry commits,
+read straight from the git object database through a tree-level diff, without a checkout.
+It reports added, removed, upgraded and downgraded ports, version changes that cannot be
+ordered, port-version bumps and replaced git-trees. REF changes of vcpkg_from_github ports
+link to the upstream commit range.
+
+Usage:
+    python diff-registry.py <old-commit> [<new-commit>] [--format markdown|json]
+
+Useful when bumping the registry "baseline" in a vcpkg-configuration.json.
+
+Requirements:
+    - Python 3.7+
+    - 'packaging' module (install with pip if missing)
+    - Requires git in PATH
+"""
+
+import argparse
+import json
+import subprocess
+from typing import Optional, List, Dict, Tuple
+try:
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    print("Error: The 'packaging' module is required. Install it with 'pip install packaging'.")
+    exit(1)
+
+from util.git import read_git_objects
+from util.cmake import get_source_calls
+from util.util import get_versions_file_path
+
+# Order and headings of the changes in the markdown output
+CHANGE_HEADINGS = [
+    ("added", "Added"),
+    ("removed", "Removed"),
+    ("upgraded", "Upgraded"),
+    ("downgraded", "Downgraded"),
+    ("changed", "Changed versions"),
+    ("port-version", "Port-version changes"),
+    ("replaced", "Replaced git-trees"),
+]
+
+def resolve_commits(old: str, new: str) -> Optional[Tuple[str, str]]:
+    try:
+        result = subprocess.run(["git", "rev-parse", f"{old}^{{commit}}", f"{new}^{{commit}}"],
+                                capture_output=True, text=True, check=True)
+        old_commit, new_commit = result.stdout.split()
+        return old_commit, new_commit
+    except subprocess.CalledProcessError as e:
+        print(f"Error resolving commits '{old}' and '{new}': {e.stderr.strip()}")
+        return None
+
+def get_changed_versions_files(old_commit: str, new_commit: str) -> List[str]:
+    result = subprocess.run(["git", "diff-tree", "-r", "--name-only", "--no-renames", old_commit, new_commit, "--", "versions"],
+                            capture_output=True, text=True, check=True)
+    return [path for path in result.stdout.splitlines() if path != "versions/baseline.json"]
+
+def load_json(content: Optional[bytes], default: Dict) -> Dict:
+    return json.loads(content) if content is not None else default
+
+def find_git_tree(versions_data: Dict, version: str, port_version: int) -> Optional[str]:
+    for entry in versions_data.get("versions", []):
+        if entry.get("version") == version and entry.get("port-version", 0) == port_version:
+            return entry["git-tree"]
+    return None
+
+def get_source(portfile: Optional[bytes]) -> Dict:
+    """Return REPO and REF of the vcpkg_from_github call of a portfile, if there is exactly one."""
+    if portfile is None:
+        return {}
+    try:
+        calls = [call for call in get_source_calls(portfile.decode()) if call["function"] == "vcpkg_from_github"]
+    except (ValueError, UnicodeDecodeError):
+        return {}
+    if len(calls) != 1:
+        return {}
+    return {keyword.lower(): calls[0]["arguments"][keyword]["value"] for keyword in ["REPO", "REF"] if keyword in calls[0]["arguments"]}
+
+def classify_change(old: Optional[Dict], new: Optional[Dict]) -> Optional[str]:
+    if old is None:
+        return "added"
+    if new is None:
+        return "removed"
+    if old["version"] != new["version"]:
+        try:
+            return "upgraded" if Version(new["version"]) > Version(old["version"]) else "downgraded"
+        except InvalidVersion:
+            return "changed"
+    if old["port-version"] != new["port-version"]:
+        return "port-version"
+    if old["git-tree"] != new["git-tree"]:
+        return "replaced"
+    return None
+
+def diff_registry(old_commit: str, new_commit: str) -> List[Dict]:
+    """Return the changed ports between two registry commits."""
+    changed_files = set(get_changed_versions_files(old_commit, new_commit))
+    baselines = read_git_objects([f"{old_commit}:versions/baseline.json", f"{new_commit}:versions/baseline.json"])
+    old_baseline = load_json(baselines[f"{old_commit}:versions/baseline.json"], {}).get("default", {})
+    new_baseline = load_json(baselines[f"{new_commit}:versions/baseline.json"], {}).get("default", {})
+
+    # Ports whose baseline entry or versions file changed
+    portnames = sorted(portname for portname in set(old_baseline) | set(new_baseline)
+                       if old_baseline.get(portname) != new_baseline.get(portname) or get_versions_file_path(portname) in changed_files)
+    versions_files = read_git_objects([f"{commit}:{get_versions_file_path(portname)}" for portname in portnames for commit in (old_commit, new_commit)])
+
+    states: Dict[str, Dict[str, Optional[Dict]]] = {}
+    for portname in portnames:
+        states[portname] = {}
+        for commit, baseline in ((old_commit, old_baseline), (new_commit, new_baseline)):
+            if portname not in baseline:
+                states[portname][commit] = None
+                continue
+            version = baseline[portname]["baseline"]
+            port_version = baseline[portname].get("port-version", 0)
+            versions_data = load_json(versions_files[f"{commit}:{get_versions_file_path(portname)}"], {"versions": []})
+            states[portname][commit] = {
+                "version": version,
+                "port-version": port_version,
+                "git-tree": find_git_tree(versions_data, version, port_version),
+            }
+
+    trees = [state["git-tree"] for port_states in states.values() for state in port_states.values() if state and state["git-tree"]]
+    portfiles = read_git_objects([f"{tree}:portfile.cmake" for tree in trees])
+
+    changes = []
+    for portname in portnames:
+        old, new = states[portname][old_commit], states[portname][new_commit]
+        change = classify_change(old, new)
+        if change is None:
+            continue
+        for state in (old, new):
+            if state and state["git-tree"]:
+                state.update(get_source(portfiles.get(f"{state['git-tree']}:portfile.cmake")))
+        entry = {"port": portname, "change": change, "old": old, "new": new}
+        if old and new and old.get("ref") and new.get("ref") and old["ref"] != new["ref"] and old.get("repo") == new.get("repo"):
+            entry["compare"] = f"https://github.com/{new['repo']}/compare/{old['ref']}...{new['ref']}"
+        changes.append(entry)
+    return changes
+
+def format_version(state: Dict) -> str:
+    return state["version"] if state["port-version"] == 0 else f"{state['version']}#{state['port-version']}"
+
+def format_markdown(old_commit: str, new_commit: str, changes: List[Dict]) -> str:
+    lines = [f"## Registry changes {old_commit[:12]}..{new_commit[:12]}", ""]
+    if not changes:
+        lines.append("No port changes.")
+    for change_type, heading in CHANGE_HEADINGS:
+        entries = [change for change in changes if change["change"] == change_type]
+        if not entries:
+            continue
+        lines.append(f"### {heading}")
+        for change in entries:
+            old, new = change["old"], change["new"]
+            if old is None:
+                line = f"- **{change['port']}** {format_version(new)}"
+            elif new is None:
+                line = f"- **{change['port']}** {format_version(old)}"
+            else:
+                line = f"- **{change['port']}** {format_version(old)} -> {format_version(new)}"
+            if "compare" in change:
+                line += f" ([{old['ref'][:12]}...{new['ref'][:12]}]({change['compare']}))"
+            elif new and new.get("ref") and (old is None or old.get("ref") != new.get("ref")):
+                line += f" (REF {new['ref'][:12]})"
+            lines.append(line)
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show what changed in the registry between two commits")
+    parser.add_argument("old", help="Old registry commit, e.g. the current baseline in vcpkg-configuration.json")
+    parser.add_argument("new", nargs="?", default="HEAD", help="New registry commit (default: HEAD)")
+    parser.add_argument("-f", "--format", choices=["markdown", "json"], default="markdown", help="Output format")
+    args = parser.parse_args()
+
+    commits = resolve_commits(args.old, args.new)
+    if commits is None:
+        exit(1)
+    old_commit, new_commit = commits
+    changes = diff_registry(old_commit, new_commit)
+
+    if args.format == "json":
+        print(json.dumps({"old": old_commit, "new": new_commit, "changes": changes}, indent=2))
+    else:
+        print(format_markdown(old_commit, new_commit, changes), end="")
+
+if __name__ == "__main__":
+    main()
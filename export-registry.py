@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+export-registry.py - Export the registry as a materialized vcpkg filesystem registry.
+
+This script reads 'versions/baseline.json' and all versions files, extracts every referenced
+git-tree into 'ports/<name>/<version>' of the output directory and writes versions files with
+'path' entries. Trees are extracted in parallel and each git-tree is only read once, even if
+several versions point to it.
+
+An existing snapshot is updated incrementally, only versions whose git-tree changed are written
+and directories and versions files for versions and ports that no longer exist are removed.
+
+Usage:
+    python export-registry.py --output <directory> [--jobs <count>]
+
+Consumers can then use the snapshot as a registry:
+    { "kind": "filesystem", "path": "<directory>", "packages": [...] }
+
+Requirements:
+    - Python 3.7+
+    - Requires git in PATH
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
+
+from util.git import get_tree_archive
+from util.util import get_versions_file_path, load_versions_files
+
+# Records the git-tree of every exported port directory, used to update the snapshot incrementally
+EXPORT_STATE_FILE = ".registry-export.json"
+
+def get_port_version_directory(portname: str, version_entry: Dict) -> str:
+    """Get the snapshot directory, relative to the registry root, for a version entry."""
+    version = next(version_entry[key] for key in ("version", "version-semver", "version-date", "version-string") if key in version_entry)
+    port_version = version_entry.get("port-version", 0)
+    directory = version if port_version == 0 else f"{version}_{port_version}"
+    return f"ports/{portname}/{directory}"
+
+def extract_tree(tree_hash: str, destinations: List[str]) -> None:
+    """Extract a git-tree into one or more directories, replacing their content."""
+    archive = get_tree_archive(tree_hash)
+    for destination in destinations:
+        staging_dir = f"{destination}.tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(staging_dir, filter="data")
+            else:
+                tar.extractall(staging_dir)
+        shutil.rmtree(destination, ignore_errors=True)
+        os.rename(staging_dir, destination)
+
+def remove_stale_directories(output_dir: str, wanted: Dict[str, str]) -> int:
+    """Remove exported version directories that are no longer referenced by any versions file."""
+    removed = 0
+    ports_dir = os.path.join(output_dir, "ports")
+    if not os.path.isdir(ports_dir):
+        return removed
+    for portname in os.listdir(ports_dir):
+        port_dir = os.path.join(ports_dir, portname)
+        for directory in os.listdir(port_dir):
+            if f"ports/{portname}/{directory}" not in wanted:
+                shutil.rmtree(os.path.join(port_dir, directory))
+                removed += 1
+        if not os.listdir(port_dir):
+            os.rmdir(port_dir)
+    return removed
+
+def remove_stale_versions_files(output_dir: str, exported_versions: Dict) -> int:
+    """Remove versions files of ports that are no longer in the baseline."""
+    removed = 0
+    versions_dir = os.path.join(output_dir, "versions")
+    for prefix in os.listdir(versions_dir):
+        prefix_dir = os.path.join(versions_dir, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for file_name in os.listdir(prefix_dir):
+            if file_name.endswith(".json") and file_name[:-len(".json")] not in exported_versions:
+                os.remove(os.path.join(prefix_dir, file_name))
+                removed += 1
+        if not os.listdir(prefix_dir):
+            os.rmdir(prefix_dir)
+    return removed
+
+def export_registry(output_dir: str, jobs: int) -> bool:
+    """
+    Export the registry to a filesystem registry in output_dir.
+    Returns True if the snapshot is complete.
+    """
+    versions_dir = "versions"
+    baseline_file = os.path.join(versions_dir, "baseline.json")
+    if not os.path.isfile(baseline_file):
+        print(f"Error: '{baseline_file}' does not exist.")
+        return False
+
+    with open(baseline_file, "r") as f:
+        baseline_data = json.load(f)
+    versions = load_versions_files(versions_dir)
+
+    # Map each snapshot directory to its git-tree and build the filesystem versions files
+    wanted: Dict[str, str] = {}
+    exported_versions: Dict[str, List[Tuple[str, Dict]]] = {}
+    for portname in baseline_data.get("default", {}):
+        if portname not in versions:
+            print(f"Error: Port '{portname}' is in 'baseline.json' but has no versions file.")
+            return False
+        entries = []
+        for version_entry in versions[portname].get("versions", []):
+            path = get_port_version_directory(portname, version_entry)
+            wanted[path] = version_entry["git-tree"]
+            entry = {key: value for key, value in version_entry.items() if key != "git-tree"}
+            entry["path"] = f"$/{path}"
+            entries.append((version_entry["git-tree"], entry))
+        exported_versions[portname] = entries
+
+    # Only write directories whose git-tree changed since the last export
+    state_file = os.path.join(output_dir, EXPORT_STATE_FILE)
+    state: Dict[str, str] = {}
+    if os.path.isfile(state_file):
+        with open(state_file, "r") as f:
+            state = json.load(f)
+
+    pending: Dict[str, List[str]] = {}
+    for path, tree_hash in wanted.items():
+        destination = os.path.join(output_dir, *path.split("/"))
+        if state.get(path) == tree_hash and os.path.isdir(destination):
+            continue
+        pending.setdefault(tree_hash, []).append(destination)
+
+    removed = remove_stale_directories(output_dir, wanted)
+    for destinations in pending.values():
+        for destination in destinations:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+
+    failed: List[Tuple[str, Exception]] = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(extract_tree, tree_hash, destinations): tree_hash for tree_hash, destinations in pending.items()}
+        for future, tree_hash in futures.items():
+            try:
+                future.result()
+            except (subprocess.CalledProcessError, OSError, tarfile.TarError) as e:
+                failed.append((tree_hash, e))
+
+    failed_trees = {tree_hash for tree_hash, _ in failed}
+    for tree_hash, e in failed:
+        print(f"Error extracting git-tree {tree_hash}: {e}")
+
+    # Save versions files and baseline, without the versions whose git-tree could not be extracted
+    exported_baseline: Dict[str, Dict] = {}
+    for portname, entries in exported_versions.items():
+        data = {"versions": [entry for tree_hash, entry in entries if tree_hash not in failed_trees]}
+        json_file = os.path.join(output_dir, *get_versions_file_path(portname).split("/"))
+        os.makedirs(os.path.dirname(json_file), exist_ok=True)
+        with open(json_file, "w", newline='\n') as f:
+            json.dump(data, f, indent=2)
+        baseline = baseline_data["default"][portname]
+        baseline_path = get_port_version_directory(portname, {"version": baseline["baseline"], "port-version": baseline.get("port-version", 0)})
+        if f"$/{baseline_path}" in (entry["path"] for entry in data["versions"]):
+            exported_baseline[portname] = baseline
+        else:
+            print(f"Error: Port '{portname}' is left out of the exported baseline, its baseline version could not be extracted.")
+    with open(os.path.join(output_dir, "versions", "baseline.json"), "w", newline='\n') as f:
+        json.dump(dict(baseline_data, default=exported_baseline), f, indent=2)
+    removed_files = remove_stale_versions_files(output_dir, exported_versions)
+
+    new_state = {path: tree_hash for path, tree_hash in wanted.items() if tree_hash not in failed_trees}
+    with open(state_file, "w", newline='\n') as f:
+        json.dump(new_state, f, indent=2, sort_keys=True)
+
+    extracted = sum(len(destinations) for tree_hash, destinations in pending.items() if tree_hash not in failed_trees)
+    print(f"Exported {len(exported_versions)} ports to '{output_dir}': {extracted} version directories written, "
+          f"{len(wanted) - sum(len(d) for d in pending.values())} unchanged, {removed} removed, {removed_files} stale versions files removed.")
+    return not failed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the registry as a vcpkg filesystem registry")
+    parser.add_argument("-o", "--output", required=True, help="Directory to write the filesystem registry to")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 4, help="Number of git-trees to extract in parallel")
+    args = parser.parse_args()
+
+    if not export_registry(args.output, args.jobs):
+        print("Failed to export the registry.")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+test-ports.py - Build changed ports locally before pushing.
+
+This script generates an isolated manifest project for every changed port, using the ports in
+the working tree through overlay ports, and installs them with vcpkg in parallel. Each project
+has its own install, buildtrees and packages roots, so the builds do not interfere. Builds share
+a local filesystem binary cache, so unchanged dependencies are only built once, and optionally a
+local asset mirror for the source downloads.
+
+The default registry is taken from 'test/vcpkg-configuration.json', like the CI build.
+
+Usage:
+    python test-ports.py [<portname> ...] [--base <ref>] [--jobs <count>] [--report <file>]
+
+Without port names, the ports changed compared to --base (committed or not) are tested.
+
+Requirements:
+    - Python 3.7+
+    - Requires git in PATH
+    - VCPKG_ROOT must point to a vcpkg installation
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict
+
+from util.util import get_vcpkg_executable
+
+TEST_CONFIGURATION_FILE = os.path.join("test", "vcpkg-configuration.json")
+REGISTRY_REPOSITORY = "https://github.com/mwthinker/mw-vcpkg-registry.git"
+
+def get_changed_ports(base: str) -> Optional[List[str]]:
+    """Get the ports with committed, uncommitted or untracked changes compared to base."""
+    try:
+        changed = subprocess.run(["git", "diff", "--name-only", base, "--", "ports"], capture_output=True, text=True, check=True)
+        untracked = subprocess.run(["git", "ls-files", "--others", "--exclude-standard", "--", "ports"], capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Error getting changed ports compared to '{base}': {e.stderr.strip()}")
+        return None
+    portnames = set()
+    for path in changed.stdout.splitlines() + untracked.stdout.splitlines():
+        parts = path.split("/")
+        if len(parts) > 2 and os.path.isdir(os.path.join("ports", parts[1])):
+            portnames.add(parts[1])
+    return sorted(portnames)
+
+def create_test_project(portname: str, project_dir: str) -> None:
+    """Write a manifest project depending only on the port, resolving all registry ports from the working tree."""
+    with open(TEST_CONFIGURATION_FILE, "r") as f:
+        configuration = json.load(f)
+    configuration["registries"] = [registry for registry in configuration.get("registries", [])
+                                   if registry.get("repository") != REGISTRY_REPOSITORY]
+    configuration["overlay-ports"] = [os.path.abspath("ports")]
+
+    shutil.rmtree(project_dir, ignore_errors=True)
+    os.makedirs(project_dir)
+    with open(os.path.join(project_dir, "vcpkg.json"), "w", newline='\n') as f:
+        json.dump({
+            "name": f"test-{portname}",
+            "version": "0",
+            "dependencies": [portname]
+        }, f, indent=2)
+    with open(os.path.join(project_dir, "vcpkg-configuration.json"), "w", newline='\n') as f:
+        json.dump(configuration, f, indent=2)
+
+def test_port(portname: str, work_dir: str, binary_cache: str, asset_mirror: Optional[str], triplet: Optional[str]) -> Dict:
+    """Build a port in its own manifest project. Returns the result with timing and log file."""
+    project_dir = os.path.abspath(os.path.join(work_dir, portname))
+    create_test_project(portname, project_dir)
+    log_file = os.path.join(project_dir, "build.log")
+
+    command = [
+        get_vcpkg_executable(), "install",
+        f"--x-manifest-root={project_dir}",
+        f"--x-install-root={os.path.join(project_dir, 'vcpkg_installed')}",
+        f"--x-buildtrees-root={os.path.join(project_dir, 'buildtrees')}",
+        f"--x-packages-root={os.path.join(project_dir, 'packages')}",
+        f"--binarysource=clear;files,{os.path.abspath(binary_cache)},readwrite",
+    ]
+    if asset_mirror:
+        command.append(f"--x-asset-sources=clear;x-azurl,{pathlib.Path(asset_mirror).resolve().as_uri()},,readwrite")
+    if triplet:
+        command.append(f"--triplet={triplet}")
+
+    print(f"Building port: {portname}")
+    start = time.perf_counter()
+    with open(log_file, "w") as log:
+        result = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT)
+    seconds = time.perf_counter() - start
+    passed = result.returncode == 0
+    print(f"{'Passed' if passed else 'Failed'}: {portname} ({seconds:.1f} s)")
+    return {
+        "port": portname,
+        "passed": passed,
+        "seconds": round(seconds, 1),
+        "log": log_file,
+    }
+
+def test_ports(portnames: List[str], jobs: int, work_dir: str, binary_cache: str, asset_mirror: Optional[str], triplet: Optional[str]) -> List[Dict]:
+    os.makedirs(binary_cache, exist_ok=True)
+    if asset_mirror:
+        os.makedirs(asset_mirror, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(lambda portname: test_port(portname, work_dir, binary_cache, asset_mirror, triplet), portnames))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build changed ports locally in isolated manifest projects")
+    parser.add_argument("ports", nargs="*", help="Ports to test (default: ports changed compared to --base)")
+    parser.add_argument("--base", default="origin/master", help="Git ref to find changed ports against")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="Number of ports to build in parallel")
+    parser.add_argument("--work-dir", default="test-ports-build", help="Directory for the generated projects")
+    parser.add_argument("--binary-cache", help="Directory for the vcpkg binary cache (default: <work-dir>/binary-cache)")
+    parser.add_argument("--asset-mirror", help="Directory used as vcpkg asset cache for source downloads")
+    parser.add_argument("--triplet", help="Triplet to build for (default: the vcpkg default triplet)")
+    parser.add_argument("--report", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    try:
+        get_vcpkg_executable()
+    except (EnvironmentError, FileNotFoundError) as e:
+        print(f"Error: {e}")
+        exit(1)
+
+    portnames = args.ports or get_changed_ports(args.base)
+    if portnames is None:
+        exit(1)
+    missing = [portname for portname in portnames if not os.path.isdir(os.path.join("ports", portname))]
+    if missing:
+        print(f"Error: Ports not found in 'ports' directory: {', '.join(missing)}")
+        exit(1)
+    if not portnames:
+        print(f"No ports changed compared to '{args.base}'.")
+        return
+
+    binary_cache = args.binary_cache or os.path.join(args.work_dir, "binary-cache")
+    results = test_ports(portnames, args.jobs, args.work_dir, binary_cache, args.asset_mirror, args.triplet)
+
+    print(f"Tested {len(results)} port{'s' if len(results) > 1 else ''}:")
+    for result in results:
+        status = "passed" if result["passed"] else f"FAILED, see {result['log']}"
+        print(f"  {result['port']:<20} {result['seconds']:8.1f} s  {status}")
+    if args.report:
+        with open(args.report, "w", newline='\n') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote report to '{args.report}'.")
+    if not all(result["passed"] for result in results):
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from types import ModuleType
+from typing import Dict
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STANDIN_VCPKG_ROOT = os.path.join(REPO_ROOT, "tests", "vcpkg")
+
+# The scripts import the shared code as 'util.*' from the repository root
+sys.path.insert(0, REPO_ROOT)
+
+from util.util import get_versions_file_path  # noqa: E402
+
+def load_script(name: str) -> ModuleType:
+    """Import a script with a hyphenated file name, e.g. 'test-ports.py', as a module."""
+    path = os.path.join(REPO_ROOT, name)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(name)[0].replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def git(*args: str) -> str:
+    """Run git in the current directory and return its output."""
+    return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+
+def add_port_version(portname: str, files: Dict[str, str], version: str, port_version: int = 0) -> str:
+    """
+    Commit the files of a port in the current registry, then commit its versions entry and baseline.
+    Returns the git-tree of the port.
+    """
+    port_dir = os.path.join("ports", portname)
+    os.makedirs(port_dir, exist_ok=True)
+    for name, content in files.items():
+        with open(os.path.join(port_dir, name), "w", newline='\n') as f:
+            f.write(content)
+    git("add", port_dir)
+    git("commit", "-q", "-m", f"Update {portname}")
+    git_tree = git("rev-parse", f"HEAD:ports/{portname}")
+
+    versions_file = get_versions_file_path(portname)
+    versions_data = {"versions": []}
+    if os.path.isfile(versions_file):
+        with open(versions_file, "r") as f:
+            versions_data = json.load(f)
+    versions_data["versions"].insert(0, {"git-tree": git_tree, "version": version, "port-version": port_version})
+    baseline_data = {"default": {}}
+    if os.path.isfile(os.path.join("versions", "baseline.json")):
+        with open(os.path.join("versions", "baseline.json"), "r") as f:
+            baseline_data = json.load(f)
+    baseline_data["default"][portname] = {"baseline": version, "port-version": port_version}
+
+    os.makedirs(os.path.dirname(versions_file), exist_ok=True)
+    with open(versions_file, "w", newline='\n') as f:
+        json.dump(versions_data, f, indent=2)
+    with open(os.path.join("versions", "baseline.json"), "w", newline='\n') as f:
+        json.dump(baseline_data, f, indent=2)
+    git("add", "versions")
+    git("commit", "-q", "-m", f"Add {portname} {version}#{port_version}")
+    return git_tree
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """An empty git repository as current directory."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    monkeypatch.chdir(repo)
+    git("init", "-q")
+    git("config", "user.name", "test")
+    git("config", "user.email", "test@example.com")
+    git("config", "commit.gpgsign", "false")
+    return repo
+
+@pytest.fixture
+def standin_vcpkg(tmp_path, monkeypatch):
+    """Select the stand-in vcpkg through VCPKG_ROOT. Returns the directory it records its runs in."""
+    if sys.platform == "win32":
+        pytest.skip("The stand-in vcpkg is a Python script with a shebang")
+    state_dir = tmp_path / "vcpkg-state"
+    state_dir.mkdir()
+    monkeypatch.setenv("VCPKG_ROOT", STANDIN_VCPKG_ROOT)
+    monkeypatch.setenv("STANDIN_VCPKG_STATE", str(state_dir))
+    monkeypatch.delenv("STANDIN_VCPKG_FAIL", raising=False)
+    monkeypatch.delenv("STANDIN_VCPKG_SECONDS", raising=False)
+    return state_dir
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import add_port_version, load_script
+
+audit_ports_script = load_script("audit-ports.py")
+
+ARCHIVES = {
+    ("owner/alpha", "v1.0.0"): b"alpha archive",
+    ("owner/beta", "v2.0.0"): b"beta archive",
+}
+
+def get_portfile(repo_name, ref, sha512):
+    return f"vcpkg_from_github(\n    OUT_SOURCE_PATH SOURCE_PATH\n    REPO {repo_name}\n    REF {ref}\n    SHA512 {sha512}\n)\n"
+
+@pytest.fixture
+def mirror():
+    """A local server standing in for GitHub archive downloads. Serves 'content' and records 'requests'."""
+    served = {"content": {f"/{repo_name}/archive/{ref}.tar.gz": data for (repo_name, ref), data in ARCHIVES.items()}, "requests": []}
+
+    class ArchiveHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            served["requests"].append(self.path)
+            data = served["content"].get(self.path)
+            if data is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArchiveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    served["url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    yield served
+    server.shutdown()
+
+@pytest.fixture
+def registry(git_repo):
+    for (repo_name, ref), data in ARCHIVES.items():
+        portname = repo_name.split("/")[1]
+        add_port_version(portname, {"portfile.cmake": get_portfile(repo_name, ref, hashlib.sha512(data).hexdigest())}, ref[1:])
+    return git_repo
+
+def run_audit(tmp_path, mirror, cache_dir=None):
+    return audit_ports_script.audit_ports(2, 1, str(tmp_path / "downloads"), cache_dir, mirror["url"], str(tmp_path / "audit-state.json"))
+
+def load_verified(tmp_path):
+    with open(tmp_path / "audit-state.json", "r") as f:
+        return json.load(f)["verified"]
+
+def test_audit_resumes_with_unverified_archives(registry, mirror, tmp_path):
+    del mirror["content"]["/owner/beta/archive/v2.0.0.tar.gz"]
+    mismatches, failures = run_audit(tmp_path, mirror)
+
+    assert (mismatches, failures) == ([], 1)
+    assert list(load_verified(tmp_path)) == ["owner/alpha@v1.0.0"]
+
+    mirror["content"]["/owner/beta/archive/v2.0.0.tar.gz"] = ARCHIVES[("owner/beta", "v2.0.0")]
+    mirror["requests"].clear()
+    mismatches, failures = run_audit(tmp_path, mirror)
+
+    assert (mismatches, failures) == ([], 0)
+    assert mirror["requests"] == ["/owner/beta/archive/v2.0.0.tar.gz"]
+    assert sorted(load_verified(tmp_path)) == ["owner/alpha@v1.0.0", "owner/beta@v2.0.0"]
+
+    mirror["requests"].clear()
+    assert run_audit(tmp_path, mirror) == ([], 0)
+    assert mirror["requests"] == []
+
+def test_audit_reports_mismatches_and_checks_them_again(registry, mirror, tmp_path):
+    mirror["content"]["/owner/beta/archive/v2.0.0.tar.gz"] = b"regenerated beta archive"
+    mismatches, failures = run_audit(tmp_path, mirror)
+
+    assert failures == 0
+    assert [(mismatch["repo"], mismatch["actual"], mismatch["source"]) for mismatch in mismatches] == \
+           [("owner/beta", hashlib.sha512(b"regenerated beta archive").hexdigest(), "download")]
+    assert list(load_verified(tmp_path)) == ["owner/alpha@v1.0.0"]
+    assert not (tmp_path / "downloads" / "owner-beta-v2.0.0.tar.gz").exists()
+
+    mirror["requests"].clear()
+    run_audit(tmp_path, mirror)
+    assert mirror["requests"] == ["/owner/beta/archive/v2.0.0.tar.gz"]
+
+def test_audit_never_verifies_or_modifies_cached_archives(registry, mirror, tmp_path):
+    cache_dir = tmp_path / "vcpkg-downloads"
+    cache_dir.mkdir()
+    (cache_dir / "owner-alpha-v1.0.0.tar.gz").write_bytes(ARCHIVES[("owner/alpha", "v1.0.0")])
+    (cache_dir / "owner-beta-v2.0.0.tar.gz").write_bytes(b"corrupted beta archive")
+    mismatches, failures = run_audit(tmp_path, mirror, str(cache_dir))
+
+    assert failures == 0
+    assert mirror["requests"] == []
+    assert [(mismatch["repo"], mismatch["source"]) for mismatch in mismatches] == [("owner/beta", "cache")]
+    assert not (tmp_path / "audit-state.json").exists()
+    assert (cache_dir / "owner-beta-v2.0.0.tar.gz").read_bytes() == b"corrupted beta archive"
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from conftest import add_port_version, git, load_script
+
+backfill_port_script = load_script("backfill-port.py")
+
+PORTFILE = """\
+vcpkg_from_github(
+    OUT_SOURCE_PATH SOURCE_PATH
+    REPO owner/calc
+    REF 0000000000000000000000000000000000000000
+    SHA512 0
+    HEAD_REF master
+)
+"""
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch, standin_vcpkg):
+    """
+    An upstream repository 'owner/calc' served through GITHUB_URL, with the archive and vcpkg.json downloads faked.
+    Returns the commit hash of every upstream version.
+    """
+    repo = tmp_path / "upstream" / "owner" / "calc"
+    repo.mkdir(parents=True)
+    git("-C", str(repo), "init", "-q")
+    git("-C", str(repo), "config", "user.name", "test")
+    git("-C", str(repo), "config", "user.email", "test@example.com")
+    commits = {}
+    for version in ["0.0.5", "0.1.0", "0.3.0", "0.2.0"]:
+        git("-C", str(repo), "commit", "-q", "--allow-empty", "-m", f"Release {version}")
+        commits[version] = git("-C", str(repo), "rev-parse", "HEAD")
+    git("-C", str(repo), "tag", "-a", "v0.1.0", "-m", "Release 0.1.0", commits["0.1.0"])
+    git("-C", str(repo), "tag", "v0.3.0", commits["0.3.0"])
+    git("-C", str(repo), "tag", "v0.2.0-rebuilt", commits["0.2.0"])
+
+    versions = {commit: version for version, commit in commits.items()}
+    monkeypatch.setattr(backfill_port_script, "GITHUB_URL", str(tmp_path / "upstream"))
+    monkeypatch.setattr(backfill_port_script, "get_sha512_from_github", lambda repo_name, commit_hash: f"sha512-{commit_hash[:8]}")
+    monkeypatch.setattr(backfill_port_script, "get_remote_vcpkg_json", lambda repo_name, commit_hash: {"version": versions[commit_hash]})
+    return commits
+
+@pytest.fixture
+def registry(git_repo):
+    add_port_version("calculator", {"portfile.cmake": PORTFILE, "vcpkg.json": '{"name": "calculator", "version": "0.2.0"}\n'}, "0.2.0")
+    return git_repo
+
+def read_versions():
+    with open("versions/c-/calculator.json", "r") as f:
+        return json.load(f)["versions"]
+
+def test_backfill_orders_and_merges_versions(registry, upstream):
+    port_commits = git("log", "--format=%H", "--", "ports/calculator")
+
+    assert backfill_port_script.backfill_port("calculator", ["v0.1.0", "v0.3.0", upstream["0.0.5"]], 2)
+
+    versions = read_versions()
+    assert [(entry["version"], entry["port-version"]) for entry in versions] == [("0.3.0", 0), ("0.2.0", 0), ("0.1.0", 0), ("0.0.5", 0)]
+    with open("versions/baseline.json", "r") as f:
+        assert json.load(f)["default"]["calculator"] == {"baseline": "0.3.0", "port-version": 0}
+
+    # The annotated tag resolves to the tagged commit
+    portfile = git("show", f"{versions[2]['git-tree']}:portfile.cmake")
+    assert f"REF {upstream['0.1.0']}" in portfile
+    assert f"SHA512 sha512-{upstream['0.1.0'][:8]}" in portfile
+    assert json.loads(git("show", f"{versions[2]['git-tree']}:vcpkg.json"))["version"] == "0.1.0"
+
+    # One commit, with the historical trees reachable through its second parent only
+    assert git("log", "-1", "--format=%s") == "Backfilled 3 versions of calculator"
+    assert git("log", "--first-parent", "--format=%H", "--", "ports/calculator") == port_commits
+    assert git("ls-tree", "HEAD^2", "ports/calculator").split()[2] == versions[0]["git-tree"]
+    assert git("status", "--porcelain") == ""
+
+def test_backfill_refuses_conflicting_versions(registry, upstream):
+    head = git("rev-parse", "HEAD")
+    versions = read_versions()
+
+    assert not backfill_port_script.backfill_port("calculator", ["v0.1.0", "v0.2.0-rebuilt"], 2)
+    assert git("rev-parse", "HEAD") == head
+    assert read_versions() == versions
+
+def test_backfill_refuses_unknown_refs(registry, upstream):
+    head = git("rev-parse", "HEAD")
+
+    assert not backfill_port_script.backfill_port("calculator", ["v0.1.0", "v9.9.9"], 2)
+    assert git("rev-parse", "HEAD") == head
+
+def test_backfill_refuses_uncommitted_port_changes(registry, upstream):
+    with open("ports/calculator/portfile.cmake", "a") as f:
+        f.write("# local edit\n")
+
+    assert not backfill_port_script.backfill_port("calculator", ["v0.1.0"], 2)
+    assert git("log", "-1", "--format=%s") == "Add calculator 0.2.0#0"
+
+def test_merge_version_entries_orders_newest_first():
+    existing = [{"git-tree": "a", "version": "1.10.0", "port-version": 0}]
+    new_entries = [
+        {"ref": "v1.9.0", "git-tree": "b", "version": "1.9.0", "port-version": 0},
+        {"ref": "v1.10.0-1", "git-tree": "c", "version": "1.10.0", "port-version": 1},
+        {"ref": "again", "git-tree": "a", "version": "1.10.0", "port-version": 0},
+    ]
+
+    assert backfill_port_script.merge_version_entries("port", existing, new_entries) == [
+        {"git-tree": "c", "version": "1.10.0", "port-version": 1},
+        {"git-tree": "a", "version": "1.10.0", "port-version": 0},
+        {"git-tree": "b", "version": "1.9.0", "port-version": 0},
+    ]
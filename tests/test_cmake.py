@@ -0,0 +1,78 @@
+import pytest
+
+from util.cmake import get_source_calls, parse_cmake_commands, replace_spans, set_source_arguments
+
+PORTFILE = """\
+# vcpkg_from_github(REF commented-out)
+vcpkg_from_github(
+    OUT_SOURCE_PATH SOURCE_PATH
+    REPO mwthinker/Signal  # trailing comment
+    REF "0123456789abcdef0123456789abcdef01234567"
+    SHA512 abcdef
+    HEAD_REF master
+    PATCHES
+        fix-build.patch
+        [=[bracket ) argument]=]
+)
+#[[ vcpkg_from_github(REF in-a-bracket-comment) ]]
+vcpkg_cmake_configure(SOURCE_PATH "${SOURCE_PATH}" OPTIONS -DFLAG=\\"on\\")
+"""
+
+def test_parse_commands_skips_comments():
+    commands = parse_cmake_commands(PORTFILE)
+
+    assert [(command.name, command.line) for command in commands] == [("vcpkg_from_github", 2), ("vcpkg_cmake_configure", 13)]
+    assert [(argument.value, argument.kind) for argument in commands[0].arguments][-2:] == \
+           [("fix-build.patch", "unquoted"), ("bracket ) argument", "bracket")]
+    assert [argument.value for argument in commands[1].arguments] == ["SOURCE_PATH", "${SOURCE_PATH}", "OPTIONS", '-DFLAG=\\"on\\"']
+
+def test_parse_nested_parentheses():
+    commands = parse_cmake_commands("if((A AND B) OR C)\nendif()\n")
+
+    assert [command.name for command in commands] == ["if", "endif"]
+    assert [argument.value for argument in commands[0].arguments] == ["A", "AND", "B", "OR", "C"]
+
+@pytest.mark.parametrize("text", [
+    "vcpkg_from_github(REPO a/b",
+    'message("unterminated)',
+    "set(X [[unterminated)",
+    "not a command\n",
+])
+def test_parse_invalid_syntax(text):
+    with pytest.raises(ValueError):
+        parse_cmake_commands(text)
+
+def test_get_source_calls():
+    calls = get_source_calls(PORTFILE)
+
+    assert len(calls) == 1
+    call = calls[0]
+    assert call["function"] == "vcpkg_from_github"
+    assert call["line"] == 2
+    assert {keyword: argument["value"] for keyword, argument in call["arguments"].items()} == {
+        "OUT_SOURCE_PATH": "SOURCE_PATH",
+        "REPO": "mwthinker/Signal",
+        "REF": "0123456789abcdef0123456789abcdef01234567",
+        "SHA512": "abcdef",
+        "HEAD_REF": "master",
+    }
+    ref = call["arguments"]["REF"]
+    assert PORTFILE[ref["start"]:ref["end"]] == '"0123456789abcdef0123456789abcdef01234567"'
+
+def test_set_source_arguments_only_replaces_the_spans():
+    call = get_source_calls(PORTFILE)[0]
+    text = set_source_arguments(PORTFILE, call, {"REF": "fedcba", "SHA512": "123456"})
+
+    expected = PORTFILE.replace('"0123456789abcdef0123456789abcdef01234567"', "fedcba").replace("SHA512 abcdef", "SHA512 123456")
+    assert text == expected
+    assert get_source_calls(text)[0]["arguments"]["HEAD_REF"]["value"] == "master"
+
+def test_set_source_arguments_missing_keyword():
+    call = get_source_calls("vcpkg_from_github(REPO a/b REF c)")[0]
+    with pytest.raises(KeyError):
+        set_source_arguments("vcpkg_from_github(REPO a/b REF c)", call, {"SHA512": "d"})
+
+def test_replace_spans_rejects_overlaps():
+    assert replace_spans("abcdef", [(4, 6, "XY"), (0, 1, "")]) == "bcdXY"
+    with pytest.raises(ValueError):
+        replace_spans("abcdef", [(0, 3, ""), (2, 4, "")])
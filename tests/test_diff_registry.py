@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from conftest import add_port_version, git, load_script
+
+diff_registry_script = load_script("diff-registry.py")
+
+def get_portfile(ref):
+    return f"vcpkg_from_github(\n    OUT_SOURCE_PATH SOURCE_PATH\n    REPO owner/signal\n    REF {ref}\n    SHA512 0\n)\n"
+
+def state(version, port_version=0, git_tree="a" * 40):
+    return {"version": version, "port-version": port_version, "git-tree": git_tree}
+
+@pytest.mark.parametrize("old, new, change", [
+    (None, state("1.0.0"), "added"),
+    (state("1.0.0"), None, "removed"),
+    (state("1.0.0"), state("1.10.0"), "upgraded"),
+    (state("1.10.0"), state("1.9.0"), "downgraded"),
+    (state("2024-01-01"), state("nightly"), "changed"),
+    (state("1.0.0"), state("1.0.0", 1), "port-version"),
+    (state("1.0.0"), state("1.0.0", git_tree="b" * 40), "replaced"),
+    (state("1.0.0"), state("1.0.0"), None),
+])
+def test_classify_change(old, new, change):
+    assert diff_registry_script.classify_change(old, new) == change
+
+def remove_port(portname):
+    with open("versions/baseline.json", "r") as f:
+        baseline_data = json.load(f)
+    del baseline_data["default"][portname]
+    with open("versions/baseline.json", "w", newline='\n') as f:
+        json.dump(baseline_data, f, indent=2)
+    git("commit", "-q", "-am", f"Remove {portname}")
+
+def test_diff_registry(git_repo):
+    add_port_version("signal", {"portfile.cmake": get_portfile("1" * 40)}, "1.0.0")
+    add_port_version("stale", {"vcpkg.json": '{"name": "stale", "version": "1.0.0"}\n'}, "1.0.0")
+    add_port_version("stable", {"vcpkg.json": '{"name": "stable", "version": "1.0.0"}\n'}, "1.0.0")
+    add_port_version("tweaked", {"vcpkg.json": '{"name": "tweaked", "version": "1.0.0"}\n'}, "1.0.0")
+    old_commit = git("rev-parse", "HEAD")
+    signal_tree = add_port_version("signal", {"portfile.cmake": get_portfile("2" * 40)}, "1.1.0")
+    add_port_version("fresh", {"vcpkg.json": '{"name": "fresh", "version": "0.1.0"}\n'}, "0.1.0")
+    tweaked_tree = add_port_version("tweaked", {"vcpkg.json": '{"name": "tweaked", "version": "1.0.0", "port-version": 1}\n'}, "1.0.0", 1)
+    remove_port("stale")
+    new_commit = git("rev-parse", "HEAD")
+
+    changes = diff_registry_script.diff_registry(old_commit, new_commit)
+
+    assert [(change["port"], change["change"]) for change in changes] == \
+           [("fresh", "added"), ("signal", "upgraded"), ("stale", "removed"), ("tweaked", "port-version")]
+    signal = changes[1]
+    assert signal["new"] == {"version": "1.1.0", "port-version": 0, "git-tree": signal_tree, "repo": "owner/signal", "ref": "2" * 40}
+    assert signal["compare"] == f"https://github.com/owner/signal/compare/{'1' * 40}...{'2' * 40}"
+    assert changes[3]["new"]["git-tree"] == tweaked_tree
+    assert diff_registry_script.diff_registry(new_commit, new_commit) == []
+
+    markdown = diff_registry_script.format_markdown(old_commit, new_commit, changes)
+    assert "### Added\n- **fresh** 0.1.0\n" in markdown
+    assert f"- **signal** 1.0.0 -> 1.1.0 ([{'1' * 12}...{'2' * 12}](https://github.com/owner/signal/compare/{'1' * 40}...{'2' * 40}))" in markdown
+    assert "### Removed\n- **stale** 1.0.0\n" in markdown
+    assert "- **tweaked** 1.0.0 -> 1.0.0#1" in markdown
+
+def test_diff_registry_replaced_git_tree(git_repo):
+    old_tree = add_port_version("signal", {"portfile.cmake": get_portfile("1" * 40)}, "1.0.0")
+    old_commit = git("rev-parse", "HEAD")
+    new_tree = add_port_version("signal", {"portfile.cmake": get_portfile("2" * 40)}, "1.0.0")
+
+    changes = diff_registry_script.diff_registry(old_commit, git("rev-parse", "HEAD"))
+
+    assert [(change["change"], change["old"]["git-tree"], change["new"]["git-tree"]) for change in changes] == [("replaced", old_tree, new_tree)]
+    assert "compare" in changes[0]
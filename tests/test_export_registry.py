@@ -0,0 +1,83 @@
+import json
+import os
+
+from conftest import add_port_version, git, load_script
+
+export_registry_script = load_script("export-registry.py")
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def commit_baseline(baseline_data):
+    with open(os.path.join("versions", "baseline.json"), "w", newline='\n') as f:
+        json.dump(baseline_data, f, indent=2)
+    git("commit", "-q", "-am", "Update baseline")
+
+def test_export_writes_filesystem_registry(git_repo, tmp_path):
+    add_port_version("foo", {"vcpkg.json": '{"name": "foo", "version": "1.0.0"}\n'}, "1.0.0")
+    add_port_version("foo", {"vcpkg.json": '{"name": "foo", "version": "1.0.0", "port-version": 1}\n'}, "1.0.0", 1)
+    output_dir = tmp_path / "snapshot"
+
+    assert export_registry_script.export_registry(str(output_dir), 2)
+
+    assert read_json(output_dir / "versions" / "f-" / "foo.json") == {"versions": [
+        {"version": "1.0.0", "port-version": 1, "path": "$/ports/foo/1.0.0_1"},
+        {"version": "1.0.0", "port-version": 0, "path": "$/ports/foo/1.0.0"},
+    ]}
+    assert read_json(output_dir / "versions" / "baseline.json") == {"default": {"foo": {"baseline": "1.0.0", "port-version": 1}}}
+    assert read_json(output_dir / "ports" / "foo" / "1.0.0_1" / "vcpkg.json")["port-version"] == 1
+
+def test_export_only_writes_changed_trees(git_repo, tmp_path, monkeypatch):
+    add_port_version("foo", {"vcpkg.json": '{"name": "foo", "version": "1.0.0"}\n'}, "1.0.0")
+    output_dir = tmp_path / "snapshot"
+    assert export_registry_script.export_registry(str(output_dir), 2)
+
+    extracted = []
+    extract_tree = export_registry_script.extract_tree
+    def recording_extract_tree(tree_hash, destinations):
+        extracted.extend(destinations)
+        extract_tree(tree_hash, destinations)
+    monkeypatch.setattr(export_registry_script, "extract_tree", recording_extract_tree)
+    add_port_version("bar", {"vcpkg.json": '{"name": "bar", "version": "2.0.0"}\n'}, "2.0.0")
+    assert export_registry_script.export_registry(str(output_dir), 2)
+
+    assert extracted == [str(output_dir / "ports" / "bar" / "2.0.0")]
+
+def test_export_removes_ports_left_out_of_the_baseline(git_repo, tmp_path):
+    add_port_version("foo", {"vcpkg.json": '{"name": "foo", "version": "1.0.0"}\n'}, "1.0.0")
+    add_port_version("bar", {"vcpkg.json": '{"name": "bar", "version": "2.0.0"}\n'}, "2.0.0")
+    output_dir = tmp_path / "snapshot"
+    assert export_registry_script.export_registry(str(output_dir), 2)
+
+    baseline_data = read_json(os.path.join("versions", "baseline.json"))
+    del baseline_data["default"]["bar"]
+    commit_baseline(baseline_data)
+    assert export_registry_script.export_registry(str(output_dir), 2)
+
+    assert not (output_dir / "ports" / "bar").exists()
+    assert not (output_dir / "versions" / "b-").exists()
+    assert (output_dir / "versions" / "f-" / "foo.json").is_file()
+    assert read_json(output_dir / "versions" / "baseline.json") == {"default": {"foo": {"baseline": "1.0.0", "port-version": 0}}}
+
+def test_export_leaves_out_failed_trees(git_repo, tmp_path, monkeypatch):
+    add_port_version("foo", {"vcpkg.json": '{"name": "foo", "version": "1.0.0"}\n'}, "1.0.0")
+    bar_tree = add_port_version("bar", {"vcpkg.json": '{"name": "bar", "version": "2.0.0"}\n'}, "2.0.0")
+    output_dir = tmp_path / "snapshot"
+
+    extract_tree = export_registry_script.extract_tree
+    def failing_extract_tree(tree_hash, destinations):
+        if tree_hash == bar_tree:
+            raise OSError("disk full")
+        extract_tree(tree_hash, destinations)
+    monkeypatch.setattr(export_registry_script, "extract_tree", failing_extract_tree)
+
+    assert not export_registry_script.export_registry(str(output_dir), 2)
+    assert read_json(output_dir / "versions" / "b-" / "bar.json") == {"versions": []}
+    assert read_json(output_dir / "versions" / "baseline.json") == {"default": {"foo": {"baseline": "1.0.0", "port-version": 0}}}
+    assert "ports/bar/2.0.0" not in read_json(output_dir / export_registry_script.EXPORT_STATE_FILE)
+
+    # The next export retries the failed tree
+    monkeypatch.setattr(export_registry_script, "extract_tree", extract_tree)
+    assert export_registry_script.export_registry(str(output_dir), 2)
+    assert read_json(output_dir / "versions" / "b-" / "bar.json")["versions"][0]["path"] == "$/ports/bar/2.0.0"
@@ -0,0 +1,34 @@
+import subprocess
+
+from util.git import get_blob_hash, get_tree_hash, list_tree, make_tree, write_blob
+
+def test_blob_hash_matches_git(git_repo):
+    for content in [b"", b"vcpkg_from_github()\n", bytes(range(256)) * 100]:
+        assert get_blob_hash(content) == write_blob(content)
+
+def test_tree_hash_matches_git(git_repo):
+    blob = write_blob(b"content\n")
+    script = write_blob(b"#!/bin/sh\n")
+    subtree = make_tree([("100644", "blob", blob, "file.txt")])
+    # 'a' as a directory sorts as 'a/', after 'a.b' and before 'a0'
+    entries = [
+        ("100644", "blob", blob, "a0"),
+        ("040000", "tree", subtree, "a"),
+        ("100755", "blob", script, "run.sh"),
+        ("100644", "blob", blob, "a.b"),
+        ("120000", "blob", blob, "link"),
+    ]
+
+    assert get_tree_hash(entries) == make_tree(entries)
+    assert get_tree_hash([]) == make_tree([])
+
+def test_tree_hash_of_listed_tree(git_repo):
+    (git_repo / "ports" / "signal").mkdir(parents=True)
+    (git_repo / "ports" / "signal" / "vcpkg.json").write_text("{}\n")
+    (git_repo / "ports" / "signal" / "portfile.cmake").write_text("vcpkg_from_github()\n")
+    (git_repo / "ports" / "signal" / "usage").write_text("find_package(Signal)\n")
+    subprocess.run(["git", "add", "ports"], check=True)
+    subprocess.run(["git", "commit", "-q", "-m", "Add signal"], check=True)
+    port_tree = subprocess.run(["git", "rev-parse", "HEAD:ports/signal"], capture_output=True, text=True, check=True).stdout.strip()
+
+    assert get_tree_hash(list_tree(port_tree)) == port_tree
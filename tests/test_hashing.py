@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import io
+import os
+import socket
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from util import hashing
+
+class ShortReads(io.RawIOBase):
+    """A stream returning at most a few bytes per read, like a slow socket."""
+    def __init__(self, data: bytes, chunk: int):
+        self.stream = io.BytesIO(data)
+        self.chunk = chunk
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(min(len(buffer), self.chunk))
+        buffer[:len(data)] = data
+        return len(data)
+
+@pytest.mark.parametrize("size", [0, 1, hashing.BUFFER_SIZE - 1, hashing.BUFFER_SIZE, 5 * hashing.BUFFER_SIZE + 3])
+def test_hash_stream_matches_hashlib(size):
+    data = os.urandom(size)
+    digests = hashing.hash_stream(io.BytesIO(data), size, git_blob=True)
+
+    assert digests == {
+        "sha512": hashlib.sha512(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": size,
+        "git-blob": hashlib.sha1(b"blob %d\0" % size + data).hexdigest(),
+    }
+
+def test_hash_stream_reuses_small_buffers(monkeypatch):
+    # More buffers than the pool holds, so every buffer is handed back by all digests several times
+    monkeypatch.setattr(hashing, "BUFFER_SIZE", 7)
+    monkeypatch.setattr(hashing, "BUFFER_COUNT", 2)
+    data = os.urandom(1000)
+    digests = hashing.hash_stream(ShortReads(data, 3), len(data), git_blob=True)
+
+    assert digests["sha512"] == hashlib.sha512(data).hexdigest()
+    assert digests["sha256"] == hashlib.sha256(data).hexdigest()
+    assert digests["git-blob"] == hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def test_hash_stream_without_size():
+    data = os.urandom(12345)
+    digests = hashing.hash_stream(io.BytesIO(data), git_blob=True)
+
+    assert digests["size"] == len(data)
+    assert digests["sha512"] == hashlib.sha512(data).hexdigest()
+    assert digests["git-blob"] is None
+
+def test_hash_stream_size_mismatch():
+    with pytest.raises(IOError):
+        hashing.hash_stream(io.BytesIO(b"truncated"), 100)
+
+def test_hash_file_git_blob_matches_git(tmp_path):
+    file_path = tmp_path / "archive.tar.gz"
+    file_path.write_bytes(os.urandom(3 * hashing.BUFFER_SIZE + 11))
+    git_blob = subprocess.run(["git", "hash-object", "--no-filters", str(file_path)], capture_output=True, text=True, check=True).stdout.strip()
+
+    assert hashing.hash_file(str(file_path), git_blob=True)["git-blob"] == git_blob
+
+ARCHIVE = os.urandom(3 * 1024 * 1024 + 5)
+
+@pytest.fixture(scope="module")
+def server():
+    """Serves ARCHIVE at '/plain', gzip encoded at '/gzip' and chunked at '/chunked'."""
+    class ArchiveHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            data = gzip.compress(ARCHIVE) if self.path == "/gzip" else ARCHIVE
+            self.send_response(200)
+            if self.path == "/gzip":
+                self.send_header("Content-Encoding", "gzip")
+            if self.path == "/chunked":
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for offset in range(0, len(data), 100000):
+                    chunk = data[offset:offset + 100000]
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.write(b"0\r\n\r\n")
+                return
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArchiveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+@pytest.mark.parametrize("path", ["/plain", "/gzip", "/chunked"])
+def test_hash_response(server, path):
+    with requests.get(f"{server}{path}", stream=True) as response:
+        digests = hashing.hash_response(response)
+
+    assert digests["sha512"] == hashlib.sha512(ARCHIVE).hexdigest()
+    assert digests["sha256"] == hashlib.sha256(ARCHIVE).hexdigest()
+    assert digests["size"] == len(ARCHIVE)
+
+def test_hash_response_reads_into_buffers_without_urllib3(server, monkeypatch):
+    with requests.get(f"{server}/plain", stream=True) as response:
+        def read(*args, **kwargs):
+            raise AssertionError("read through urllib3")
+        monkeypatch.setattr(response.raw, "read", read)
+        monkeypatch.setattr(response.raw, "readinto", read)
+        assert hashing.hash_response(response)["sha512"] == hashlib.sha512(ARCHIVE).hexdigest()
+
+def test_hash_response_truncated():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    def serve_truncated() -> None:
+        connection, _ = listener.accept()
+        connection.recv(4096)
+        connection.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 1000000\r\n\r\n" + b"x" * 1000)
+        connection.close()
+    threading.Thread(target=serve_truncated, daemon=True).start()
+
+    with pytest.raises(IOError):
+        with requests.get(f"http://127.0.0.1:{listener.getsockname()[1]}/", stream=True) as response:
+            hashing.hash_response(response)
+    listener.close()
@@ -0,0 +1,76 @@
+import argparse
+
+import pytest
+
+from util import registry
+
+PORTFILE = """\
+vcpkg_from_github(
+    OUT_SOURCE_PATH SOURCE_PATH
+    REPO owner/signal
+    REF 0000000000000000000000000000000000000000
+    SHA512 0
+    HEAD_REF master
+)
+"""
+
+@pytest.fixture
+def port(tmp_path, monkeypatch):
+    """A port 'signal' in the current directory, with the download, prompts and versions update faked."""
+    (tmp_path / "ports" / "signal").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    calls = {"download": 0, "remove_highest_version": 0}
+    def download(repo_name, git_hash):
+        calls["download"] += 1
+        return "f" * 128
+    def remove_highest_version(portname):
+        calls["remove_highest_version"] += 1
+    monkeypatch.setattr(registry, "get_sha512_from_github", download)
+    monkeypatch.setattr(registry, "remove_highest_version", remove_highest_version)
+    monkeypatch.setattr(registry, "format_vcpkg_manifest", lambda path: True)
+    monkeypatch.setattr("builtins.input", lambda prompt: "yes")
+    return calls
+
+def write_portfile(content):
+    with open("ports/signal/portfile.cmake", "w", newline='\n') as f:
+        f.write(content)
+
+def read_portfile():
+    with open("ports/signal/portfile.cmake", "r") as f:
+        return f.read()
+
+def run(git_hash="a" * 40):
+    registry.run(argparse.Namespace(portname="signal", git_hash=git_hash, replace=True))
+
+def test_run_updates_portfile_and_versions(port):
+    write_portfile(PORTFILE)
+    run()
+
+    assert f"REF {'a' * 40}" in read_portfile()
+    assert f"SHA512 {'f' * 128}" in read_portfile()
+    assert port == {"download": 1, "remove_highest_version": 1}
+
+@pytest.mark.parametrize("portfile", [
+    PORTFILE.replace("    SHA512 0\n", ""),
+    PORTFILE + PORTFILE.replace("owner/signal", "owner/other"),
+])
+def test_run_aborts_before_downloading(port, portfile):
+    write_portfile(portfile)
+    run()
+
+    assert read_portfile() == portfile
+    assert port == {"download": 0, "remove_highest_version": 0}
+
+def test_run_keeps_versions_when_portfile_is_not_updated(port, monkeypatch):
+    write_portfile(PORTFILE)
+    monkeypatch.setattr(registry, "replace_hash_in_portfile", lambda portname, new_ref, new_sha512: False)
+    run()
+
+    assert port == {"download": 1, "remove_highest_version": 0}
+
+def test_replace_hash_in_portfile_reports_failure(port):
+    portfile = PORTFILE.replace("    REF 0000000000000000000000000000000000000000\n", "")
+    write_portfile(portfile)
+
+    assert not registry.replace_hash_in_portfile("signal", "a" * 40, "f" * 128)
+    assert read_portfile() == portfile
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from conftest import REPO_ROOT, load_script
+
+test_ports_script = load_script("test-ports.py")
+
+PORTS = ["alpha", "beta", "gamma", "delta"]
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """A registry working tree with a few ports and the CI test configuration."""
+    root = tmp_path / "registry"
+    for portname in PORTS:
+        (root / "ports" / portname).mkdir(parents=True)
+        (root / "ports" / portname / "vcpkg.json").write_text(json.dumps({"name": portname, "version": "1.0.0"}))
+    (root / "test").mkdir()
+    shutil.copy(os.path.join(REPO_ROOT, "test", "vcpkg-configuration.json"), root / "test")
+    monkeypatch.chdir(root)
+    return root
+
+def load_runs(state_dir):
+    runs = []
+    for name in sorted(os.listdir(state_dir)):
+        with open(state_dir / name, "r") as f:
+            runs.append(json.load(f))
+    return runs
+
+def run_test_ports(portnames, jobs=2, asset_mirror=None, triplet=None):
+    return test_ports_script.test_ports(portnames, jobs, "build", os.path.join("build", "binary-cache"), asset_mirror, triplet)
+
+def test_collects_passed_and_failed_ports(registry, standin_vcpkg, monkeypatch):
+    monkeypatch.setenv("STANDIN_VCPKG_FAIL", "beta")
+    results = run_test_ports(["alpha", "beta", "gamma"])
+
+    assert [(result["port"], result["passed"]) for result in results] == [("alpha", True), ("beta", False), ("gamma", True)]
+    with open(results[1]["log"], "r") as f:
+        assert "error: building beta failed" in f.read()
+    with open(results[0]["log"], "r") as f:
+        assert "alpha installed" in f.read()
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_jobs_limits_parallel_builds(registry, standin_vcpkg, monkeypatch, jobs):
+    monkeypatch.setenv("STANDIN_VCPKG_SECONDS", "0.5")
+    results = run_test_ports(PORTS, jobs=jobs)
+
+    assert all(result["passed"] for result in results)
+    runs = load_runs(standin_vcpkg)
+    assert len(runs) == len(PORTS)
+    assert max(run["running"] for run in runs) == jobs
+
+def test_generated_project_uses_overlay_ports(registry, standin_vcpkg):
+    run_test_ports(["alpha"], asset_mirror="mirror", triplet="x64-linux")
+
+    project_dir = registry / "build" / "alpha"
+    with open(project_dir / "vcpkg.json", "r") as f:
+        assert json.load(f)["dependencies"] == ["alpha"]
+    with open(project_dir / "vcpkg-configuration.json", "r") as f:
+        configuration = json.load(f)
+    with open(registry / "test" / "vcpkg-configuration.json", "r") as f:
+        original = json.load(f)
+    assert configuration["overlay-ports"] == [str(registry / "ports")]
+    assert configuration["default-registry"] == original["default-registry"]
+    assert [entry.get("repository") for entry in configuration["registries"]] == \
+           [entry.get("repository") for entry in original["registries"] if entry.get("repository") != test_ports_script.REGISTRY_REPOSITORY]
+
+    arguments = load_runs(standin_vcpkg)[0]["arguments"]
+    assert f"--x-manifest-root={project_dir}" in arguments
+    assert f"--x-install-root={project_dir / 'vcpkg_installed'}" in arguments
+    assert f"--binarysource=clear;files,{registry / 'build' / 'binary-cache'},readwrite" in arguments
+    assert f"--x-asset-sources=clear;x-azurl,{(registry / 'mirror').as_uri()},,readwrite" in arguments
+    assert "--triplet=x64-linux" in arguments
+
+def test_main_reports_failures(registry, standin_vcpkg, monkeypatch):
+    monkeypatch.setenv("STANDIN_VCPKG_FAIL", "gamma")
+    monkeypatch.setattr("sys.argv", ["test-ports.py", "alpha", "gamma", "--work-dir", "build", "--report", "report.json"])
+    with pytest.raises(SystemExit) as exit_info:
+        test_ports_script.main()
+
+    assert exit_info.value.code == 1
+    with open(registry / "report.json", "r") as f:
+        report = json.load(f)
+    assert {result["port"]: result["passed"] for result in report} == {"alpha": True, "gamma": False}
+
+def test_main_rejects_unknown_ports(registry, standin_vcpkg, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["test-ports.py", "alpha", "missing"])
+    with pytest.raises(SystemExit) as exit_info:
+        test_ports_script.main()
+
+    assert exit_info.value.code == 1
+    assert load_runs(standin_vcpkg) == []
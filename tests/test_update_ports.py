@@ -0,0 +1,106 @@
+import json
+import types
+
+import pytest
+
+from conftest import add_port_version, git, load_script
+
+update_ports_script = load_script("update-ports.py")
+
+LATEST_COMMIT = "a" * 40
+PORTFILE = """\
+vcpkg_from_github(
+    OUT_SOURCE_PATH SOURCE_PATH
+    REPO owner/signal
+    REF 0000000000000000000000000000000000000000
+    SHA512 0
+    HEAD_REF master
+)
+"""
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self):
+        return self.data
+
+@pytest.fixture
+def upstream(monkeypatch, standin_vcpkg):
+    """Fake the GitHub queries, the upstream vcpkg.json is returned from the 'vcpkg.json' key."""
+    remote = {"vcpkg.json": {"name": "signal", "version": "1.1.0"}}
+    monkeypatch.setattr(update_ports_script, "get_latest_commit_hash", lambda repo_name, branch: LATEST_COMMIT)
+    monkeypatch.setattr(update_ports_script, "get_sha512_from_github", lambda repo_name, commit_hash: "f" * 128)
+    monkeypatch.setattr(update_ports_script, "requests", types.SimpleNamespace(
+        get=lambda url: FakeResponse(remote["vcpkg.json"]), RequestException=Exception))
+    return remote
+
+@pytest.fixture
+def registry(git_repo):
+    add_port_version("signal", {"portfile.cmake": PORTFILE, "vcpkg.json": '{"name": "signal", "version": "1.0.0"}\n'}, "1.0.0")
+    return git_repo
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def test_plan_and_apply(registry, upstream):
+    head = git("rev-parse", "HEAD")
+    plan = update_ports_script.plan_ports(["signal"], 2)
+
+    assert git("rev-parse", "HEAD") == head
+    assert git("status", "--porcelain") == ""
+    assert [port_plan["version"] for port_plan in plan["ports"]] == ["1.1.0"]
+
+    update_ports_script.apply_plan(plan)
+
+    git_tree = git("rev-parse", "HEAD:ports/signal")
+    assert git_tree == plan["ports"][0]["git-tree"]
+    assert read_json("versions/s-/signal.json")["versions"][0] == {"git-tree": git_tree, "version": "1.1.0", "port-version": 0}
+    assert read_json("versions/baseline.json")["default"]["signal"] == {"baseline": "1.1.0", "port-version": 0}
+    assert f"REF {LATEST_COMMIT}" in git("show", "HEAD:ports/signal/portfile.cmake")
+    assert git("status", "--porcelain") == ""
+
+def test_plan_uses_one_port_version(registry, upstream):
+    # 1.1.0 is already in the versions file with another git-tree, so the update is 1.1.0#1 everywhere
+    add_port_version("signal", {"vcpkg.json": '{"name": "signal", "version": "1.1.0"}\n'}, "1.1.0")
+    add_port_version("signal", {"vcpkg.json": '{"name": "signal", "version": "1.0.0"}\n'}, "1.0.0")
+    plan = update_ports_script.plan_ports(["signal"], 2)
+    update_ports_script.apply_plan(plan)
+
+    assert json.loads(git("show", "HEAD:ports/signal/vcpkg.json"))["port-version"] == 1
+    assert read_json("versions/s-/signal.json")["versions"][0]["port-version"] == 1
+    assert read_json("versions/baseline.json")["default"]["signal"] == {"baseline": "1.1.0", "port-version": 1}
+
+@pytest.mark.parametrize("change", ["working tree", "committed port", "baseline"])
+def test_apply_refuses_stale_plan(registry, upstream, change):
+    plan = update_ports_script.plan_ports(["signal"], 2)
+    if change == "committed port":
+        with open("ports/signal/usage", "w") as f:
+            f.write("find_package(Signal)\n")
+        git("add", "ports/signal/usage")
+        git("commit", "-q", "-m", "Add usage")
+    elif change == "working tree":
+        with open("ports/signal/vcpkg.json", "w") as f:
+            f.write('{"name": "signal", "version": "1.0.0", "description": "Edited"}\n')
+    else:
+        add_port_version("other", {"vcpkg.json": '{"name": "other", "version": "1.0.0"}\n'}, "1.0.0")
+    head = git("rev-parse", "HEAD")
+
+    update_ports_script.apply_plan(plan)
+
+    assert git("rev-parse", "HEAD") == head
+    assert "1.1.0" not in json.dumps(read_json("versions/baseline.json"))
+
+def test_apply_aborts_before_committing_a_different_tree(registry, upstream):
+    plan = update_ports_script.plan_ports(["signal"], 2)
+    port_plan = plan["ports"][0]
+    port_plan["git-tree"] = "0" * 40
+    head = git("rev-parse", "HEAD")
+
+    assert update_ports_script.apply_port_plan(port_plan) == []
+    assert git("rev-parse", "HEAD") == head
+    assert git("status", "--porcelain") == ""
@@ -5,8 +5,14 @@ update-ports.py - Update vcpkg ports and baseline files automatically.
 This script scans all subdirectories in the 'ports' folder, checks for updates in the corresponding GitHub repositories,
 and updates the port's vcpkg.json, portfile.cmake, and the registry's versions and baseline files as needed.
 
+The work is split in two phases. The plan phase queries GitHub for all ports concurrently and computes every
+change (REF, SHA512, version, port-version, git-tree, versions entries and baseline) without touching the
+repository. The apply phase writes and commits a plan, and refuses to run if any input changed since planning.
+
 Usage:
-    python update-ports.py
+    python update-ports.py                       Plan and apply in one go
+    python update-ports.py plan -o plan.json     Only write the plan
+    python update-ports.py apply plan.json       Apply a previously written plan
 
 Requirements:
     - Python 3.7+
@@ -16,10 +22,12 @@ Requirements:
 All changes are committed to git automatically.
 """
 
+import argparse
 import os
 import json
 import subprocess
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict
 try:
     import requests
 except ImportError:
@@ -31,7 +39,9 @@ except ImportError:
     print("Error: The 'packaging' module is required. Install it with 'pip install packaging'.")
     exit(1)
 
-from util.util import format_vcpkg_manifest, get_sha512_from_github, load_and_validate_vcpkg_json, get_or_create_baseline, get_git_tree_hash
+from util.util import get_sha512_from_github, load_and_validate_vcpkg_json, get_or_create_baseline, get_git_tree_hash, get_versions_file_path, render_vcpkg_json
+from util.git import get_blob_hash, get_tree_hash, list_tree
+from util.cmake import get_source_calls, set_source_arguments
 
 def get_latest_commit_hash(repo_name: str, branch: str) -> Optional[str]:
     url = f"https://api.github.com/repos/{repo_name}/git/refs/heads/{branch}"
@@ -71,53 +81,63 @@ def get_local_commit_hash() -> Optional[str]:
         print(f"Error getting local commit hash: {e}")
         return None
 
-def update_port(portname: str) -> list[str]:
-    """Update the port with the latest commit hash and version (or bump port-version)."""
-    portfile_path = os.path.join("ports", portname, "portfile.cmake")
-    vcpkg_json_path = os.path.join("ports", portname, "vcpkg.json")
+def get_file_blob_hash(file_path: str) -> Optional[str]:
+    """Get the git blob hash of a file in the working tree, or None if it does not exist."""
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, "rb") as f:
+        return get_blob_hash(f.read())
+
+def plan_port(portname: str, local_commit_hash: str) -> Optional[dict]:
+    """
+    Compute the update of a port to the latest commit hash and version (or bump port-version), without side effects.
+    Returns the planned change, or None if the port is up to date or could not be planned.
+    """
+    portfile_path = f"ports/{portname}/portfile.cmake"
+    vcpkg_json_path = f"ports/{portname}/vcpkg.json"
 
     if not os.path.isfile(portfile_path):
         print(f"Error: Missing 'portfile.cmake' in '{portname}' directory.")
-        return []
+        return None
 
     try:
         vcpkg_data = load_and_validate_vcpkg_json(vcpkg_json_path)
     except (FileNotFoundError, ValueError) as e:
         print(e)
-        return []
-
-    # Format the vcpkg.json file before proceeding
-    if not format_vcpkg_manifest(vcpkg_json_path):
-        print(f"Error formatting vcpkg.json for {portname}.")
-        return []
+        return None
 
-    # Extract REPO and REF from portfile.cmake
-    repo_name, current_ref, head_ref = None, None, None
     with open(portfile_path, "r") as f:
-        for line in f:
-            if line.strip().startswith("REPO "): # Match only lines starting with "REPO "
-                repo_name = line.split()[1]
-            elif line.strip().startswith("REF "): # Match only lines starting with "REF "
-                current_ref = line.split()[1]
-            elif line.strip().startswith("HEAD_REF "): # Match only lines starting with "HEAD_REF "
-                head_ref = line.split()[1]
-
-    if not repo_name or not current_ref or not head_ref:
-        print(f"Error: Missing REPO, REF or HEAD_REF in '{portfile_path}'.")
-        return []
+        portfile = f.read()
+
+    # Extract REPO and REF from the vcpkg_from_github call in portfile.cmake
+    try:
+        calls = [call for call in get_source_calls(portfile) if call["function"] == "vcpkg_from_github"]
+    except ValueError as e:
+        print(f"Error parsing '{portfile_path}': {e}")
+        return None
+    if len(calls) != 1:
+        print(f"Error: Expected exactly one vcpkg_from_github call in '{portfile_path}', found {len(calls)}.")
+        return None
+    source_call = calls[0]
+    arguments = {keyword: argument["value"] for keyword, argument in source_call["arguments"].items()}
+    repo_name, current_ref, head_ref = arguments.get("REPO"), arguments.get("REF"), arguments.get("HEAD_REF")
+
+    if not repo_name or not current_ref or not head_ref or "SHA512" not in arguments:
+        print(f"Error: Missing REPO, REF, SHA512 or HEAD_REF in '{portfile_path}'.")
+        return None
 
     latest_commit_hash = get_latest_commit_hash(repo_name, head_ref)
     if not latest_commit_hash:
-        return []
-    
+        return None
+
     if latest_commit_hash == current_ref:
         print(f"Port '{portname}' is already up to date commit hash '{current_ref}', skip")
-        return []
+        return None
 
     # Get latest SHA512 and version from GitHub
     new_sha512 = get_sha512_from_github(repo_name, latest_commit_hash)
     if not new_sha512:
-        return []
+        return None
 
     # Read version from GitHub vcpkg.json
     github_vcpkg_url = f"https://raw.githubusercontent.com/{repo_name}/{latest_commit_hash}/vcpkg.json"
@@ -131,7 +151,7 @@ def update_port(portname: str) -> list[str]:
             raise ValueError(f"Error: GitHub 'vcpkg.json' for {portname} is missing a valid 'version' field.")
     except (requests.RequestException, ValueError) as e:
         print(f"Error fetching or validating vcpkg.json from GitHub: {e}")
-        return []
+        return None
 
     current_version = vcpkg_data["version"]
     current_port_version = vcpkg_data.get("port-version", 0)
@@ -139,75 +159,182 @@ def update_port(portname: str) -> list[str]:
     try:
         if new_version == current_version and new_port_version == current_port_version:
             print(f"Port '{portname}' has not changed version '{current_version}', or port-version '{current_port_version}', skip") 
-            return []
+            return None
         elif Version(new_version) < Version(current_version):
             print(f"Error: New version '{new_version}' is less than the current version '{current_version}' for {portname}.")
-            return []
+            return None
         elif Version(new_version) == Version(current_version) and new_port_version < current_port_version:
             print(f"Error: New port-version '{new_port_version}' is less than the current port-version '{current_port_version}' for {portname}.")
-            return []
+            return None
     except InvalidVersion as e:
         print(f"Error: Invalid version format for '{portname}': {e}")
-        return []
+        return None
 
-    # Update portfile.cmake
-    with open(portfile_path, "r") as f:
-        lines = f.readlines()
+    # The port-version for the manifest, versions entry and baseline: the upstream one,
+    # bumped above any existing entry for the same version
+    versions_file = get_versions_file_path(portname)
+    version_entries: List[Dict] = []
+    if os.path.isfile(versions_file):
+        with open(versions_file, "r") as f:
+            version_port_data = json.load(f)
+        if "versions" not in version_port_data or not isinstance(version_port_data["versions"], list):
+            print(f"Error: Invalid JSON structure in '{versions_file}'.")
+            return None
+        version_entries = version_port_data["versions"]
+    port_version = new_port_version
+    for version_entry in version_entries:
+        if version_entry["version"] == new_version:
+            if port_version <= version_entry.get("port-version", 0):
+                port_version = version_entry.get("port-version", 0) + 1
 
-    with open(portfile_path, "w", newline='\n') as f:
-        for line in lines:
-            if line.strip().startswith("REF"):
-                line = f"    REF {latest_commit_hash}\n"
-            elif line.strip().startswith("SHA512"):
-                line = f"    SHA512 {new_sha512}\n"
-            f.write(line)
+    # New portfile.cmake
+    new_portfile = set_source_arguments(portfile, source_call, {"REF": latest_commit_hash, "SHA512": new_sha512})
 
-    # Update vcpkg.json
+    # New vcpkg.json
     vcpkg_data["version"] = new_version
-    vcpkg_data["port-version"] = new_port_version
+    vcpkg_data["port-version"] = port_version
     # Also update description, homepage, and license from remote vcpkg.json if present
     for field in ["description", "homepage", "license"]:
         if field in github_vcpkg_data and github_vcpkg_data[field]:
             vcpkg_data[field] = github_vcpkg_data[field]
 
-    with open(vcpkg_json_path, "w") as f:
-        json.dump(vcpkg_data, f, indent=2)
-    
-    if not format_vcpkg_manifest(vcpkg_json_path):
+    new_vcpkg_json = render_vcpkg_json(vcpkg_data)
+    if new_vcpkg_json is None:
         print(f"Error formatting vcpkg.json for {portname}.")
-        return []
+        return None
 
-    # Commit changes
-    try:
-        subprocess.run(["git", "add", portfile_path, vcpkg_json_path], check=True)
-        subprocess.run(["git", "commit", "-m", f"Updated {portname} to version {new_version}"], check=True)
-        print(f"Committed updates for {portname}.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error committing changes for {portname}: {e}")
-        return []
+    # The git-tree the port folder will have once the new files are committed
+    port_path = os.path.join("ports", portname)
+    base_tree = get_git_tree_hash(port_path, local_commit_hash)
+    if not base_tree:
+        print(f"Error: Failed to get git-tree hash for port '{portname}' at commit {local_commit_hash}.")
+        return None
+    new_blobs = {
+        "portfile.cmake": get_blob_hash(new_portfile.encode()),
+        "vcpkg.json": get_blob_hash(new_vcpkg_json.encode()),
+    }
+    git_tree = get_tree_hash([(mode, object_type, new_blobs.get(name, object_hash), name) for mode, object_type, object_hash, name in list_tree(base_tree)])
+
+    print(f"Planned update of {portname} to version {new_version} ({latest_commit_hash}).")
+    return {
+        "port": portname,
+        "repo": repo_name,
+        "previous-ref": current_ref,
+        "ref": latest_commit_hash,
+        "sha512": new_sha512,
+        "previous-version": current_version,
+        "version": new_version,
+        "port-version": port_version,
+        "base-tree": base_tree,
+        "git-tree": git_tree,
+        "inputs": {
+            portfile_path: get_file_blob_hash(portfile_path),
+            vcpkg_json_path: get_file_blob_hash(vcpkg_json_path),
+            versions_file: get_file_blob_hash(versions_file),
+        },
+        "files": {
+            portfile_path: new_portfile,
+            vcpkg_json_path: new_vcpkg_json,
+        },
+        "versions-entry": {
+            "git-tree": git_tree,
+            "version": new_version,
+            "port-version": port_version
+        },
+    }
 
-    # Get the local commit hash for the git-tree
+def plan_ports(portnames: List[str], jobs: int) -> Optional[dict]:
+    """Plan the update of all ports concurrently. Returns the plan, or None on failure."""
     local_commit_hash = get_local_commit_hash()
     if not local_commit_hash:
         print("Error: Failed to get the local commit hash.")
-        return []
+        return None
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        port_plans = [port_plan for port_plan in executor.map(lambda portname: plan_port(portname, local_commit_hash), portnames) if port_plan]
+
+    baseline_file = "versions/baseline.json"
+    return {
+        "commit": local_commit_hash,
+        "inputs": {
+            baseline_file: get_file_blob_hash(baseline_file),
+        },
+        "ports": port_plans,
+        "baseline": {
+            port_plan["port"]: {
+                "baseline": port_plan["version"],
+                "port-version": port_plan["port-version"]
+            } for port_plan in port_plans
+        },
+    }
 
-    # Get the git-tree hash for the specific port folder
+def check_plan_inputs(plan: dict) -> bool:
+    """Check that the files and port trees a plan was computed from are unchanged."""
+    local_commit_hash = get_local_commit_hash()
+    if not local_commit_hash:
+        print("Error: Failed to get the local commit hash.")
+        return False
+
+    unchanged = True
+    inputs = dict(plan["inputs"])
+    for port_plan in plan["ports"]:
+        inputs.update(port_plan["inputs"])
+        port_path = os.path.join("ports", port_plan["port"])
+        if get_git_tree_hash(port_path, local_commit_hash) != port_plan["base-tree"]:
+            print(f"Error: The committed port '{port_plan['port']}' changed since the plan was made.")
+            unchanged = False
+    for file_path, blob_hash in inputs.items():
+        if get_file_blob_hash(file_path) != blob_hash:
+            print(f"Error: '{file_path}' changed since the plan was made.")
+            unchanged = False
+    return unchanged
+
+def apply_port_plan(port_plan: dict) -> list[str]:
+    """Write and commit the planned port files, then add the planned versions entry and baseline."""
+    portname = port_plan["port"]
+    previous_files = {}
+    for file_path, content in port_plan["files"].items():
+        with open(file_path, "rb") as f:
+            previous_files[file_path] = f.read()
+        with open(file_path, "wb") as f:
+            f.write(content.encode())
+
+    # The staged git-tree must be the planned one before committing, otherwise the versions entry would be wrong
     port_path = os.path.join("ports", portname)
-    git_tree = get_git_tree_hash(port_path, local_commit_hash)
-    if not git_tree:
-        print(f"Error: Failed to get git-tree hash for port '{portname}' at commit {local_commit_hash}.")
+    try:
+        subprocess.run(["git", "add", *port_plan["files"]], check=True)
+        index_tree = subprocess.run(["git", "write-tree"], capture_output=True, text=True, check=True).stdout.strip()
+    except subprocess.CalledProcessError as e:
+        print(f"Error staging changes for {portname}: {e}")
+        index_tree = None
+    git_tree = get_git_tree_hash(port_path, index_tree) if index_tree else None
+    if git_tree != port_plan["git-tree"]:
+        if git_tree:
+            print(f"Error: Staged git-tree '{git_tree}' for port '{portname}' differs from the planned '{port_plan['git-tree']}'.")
+        subprocess.run(["git", "reset", "-q", "--", *port_plan["files"]])
+        for file_path, content in previous_files.items():
+            with open(file_path, "wb") as f:
+                f.write(content)
+        print(f"Restored the files of {portname}, nothing was committed.")
+        return []
+
+    # Commit changes
+    try:
+        subprocess.run(["git", "commit", "-m", f"Updated {portname} to version {port_plan['version']}"], check=True)
+        print(f"Committed updates for {portname}.")
+    except subprocess.CalledProcessError as e:
+        print(f"Error committing changes for {portname}: {e}")
         return []
 
     # Update versions file and baseline.json
-    return add_or_update_versions_file(portname, new_version, git_tree)
-    
+    return add_versions_entry(portname, port_plan["versions-entry"])
+
 def get_or_create_versions_file(portname: str) -> tuple[str, dict]:
     versions_dir = "versions"
     if not os.path.isdir(versions_dir):
         os.makedirs(versions_dir)
 
-    json_file = os.path.join(versions_dir, f"{portname[0]}-", f"{portname}.json")
+    json_file = get_versions_file_path(portname)
     if not os.path.isfile(json_file):
         print(f"Creating new version file '{json_file}' for port '{portname}'.")
         os.makedirs(os.path.dirname(json_file), exist_ok=True)
@@ -216,60 +343,51 @@ def get_or_create_versions_file(portname: str) -> tuple[str, dict]:
     with open(json_file, "r") as f:
         return json_file, json.load(f)
 
-def add_or_update_versions_file(portname: str, new_version: str, git_tree: str) -> list[str]:
+def add_versions_entry(portname: str, version_entry: dict) -> list[str]:
     version_port_file, version_port_data = get_or_create_versions_file(portname)
     if "versions" not in version_port_data or not isinstance(version_port_data["versions"], list):
         print(f"Error: Invalid JSON structure in '{version_port_file}'.")
         return []
 
-    # Check if the version already exists and bump port-version if necessary
-    port_version = 0
-    for version_entry in version_port_data["versions"]:
-        if version_entry["version"] == new_version:
-            if port_version <= version_entry["port-version"]:
-                port_version = version_entry["port-version"] + 1
     # Add a new version entry
-    version_port_data["versions"].insert(0, {
-        "git-tree": git_tree,
-        "version": new_version,
-        "port-version": port_version
-    })
+    version_port_data["versions"].insert(0, dict(version_entry))
 
     # Save the updated JSON file
     with open(version_port_file, "w", newline='\n') as f:
         json.dump(version_port_data, f, indent=2)
-    print(f"Updated '{version_port_file}' with new version: {new_version}.")
+    print(f"Updated '{version_port_file}' with new version: {version_entry['version']}.")
 
     baseline_file, baseline_data = get_or_create_baseline()
     baseline_data["default"][portname] = {
-        "baseline": new_version,
-        "port-version": port_version
+        "baseline": version_entry["version"],
+        "port-version": version_entry["port-version"]
     }
     
     # Save the updated baseline.json
     with open(baseline_file, "w", newline='\n') as f:
         json.dump(baseline_data, f, indent=2)
 
-    print(f"Updated 'baseline.json' for port '{portname}' with new version: {new_version}.")
+    print(f"Updated 'baseline.json' for port '{portname}' with new version: {version_entry['version']}.")
     return [version_port_file, baseline_file]
 
-def main() -> None:
-    ports_dir = "ports"
-    if not os.path.isdir(ports_dir):
-        print(f"Error: '{ports_dir}' directory does not exist.")
+def apply_plan(plan: dict) -> None:
+    if not plan["ports"]:
+        print("No ports were updated.")
+        return
+
+    if not check_plan_inputs(plan):
+        print("Error: The plan is out of date, create a new plan.")
         return
 
     updated_ports = []
     updated_files = []
 
-    for portname in os.listdir(ports_dir):
-        port_path = os.path.join(ports_dir, portname)
-        if os.path.isdir(port_path):
-            print(f"Processing port: {portname}")
-            files = update_port(portname)
-            if files:  # Only if something was updated
-                updated_files.extend(files)
-                updated_ports.append(portname)
+    for port_plan in plan["ports"]:
+        print(f"Applying update of port: {port_plan['port']}")
+        files = apply_port_plan(port_plan)
+        if files:  # Only if something was updated
+            updated_files.extend(files)
+            updated_ports.append(port_plan["port"])
 
     if updated_ports:
         print(f"Successfully updated ports: {', '.join(updated_ports)}")
@@ -290,5 +408,37 @@ def main() -> None:
     else:
         print("No ports were updated.")
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Update vcpkg ports and baseline files")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of ports to plan concurrently")
+    subparsers = parser.add_subparsers(dest="command")
+    plan_parser = subparsers.add_parser("plan", help="Compute the updates and write them to a plan file")
+    plan_parser.add_argument("-o", "--output", default="update-plan.json", help="Plan file to write")
+    apply_parser = subparsers.add_parser("apply", help="Apply a plan file")
+    apply_parser.add_argument("plan", help="Plan file to apply")
+    args = parser.parse_args()
+
+    if args.command == "apply":
+        with open(args.plan, "r") as f:
+            apply_plan(json.load(f))
+        return
+
+    ports_dir = "ports"
+    if not os.path.isdir(ports_dir):
+        print(f"Error: '{ports_dir}' directory does not exist.")
+        return
+
+    portnames = [portname for portname in os.listdir(ports_dir) if os.path.isdir(os.path.join(ports_dir, portname))]
+    plan = plan_ports(portnames, args.jobs)
+    if plan is None:
+        return
+
+    if args.command == "plan":
+        with open(args.output, "w", newline='\n') as f:
+            json.dump(plan, f, indent=2)
+        print(f"Wrote plan for {len(plan['ports'])} port{'s' if len(plan['ports']) != 1 else ''} to '{args.output}'.")
+    else:
+        apply_plan(plan)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
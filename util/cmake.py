@@ -0,0 +1,166 @@
+import re
+from typing import Optional, List, Dict, Tuple, NamedTuple
+
+class CMakeArgument(NamedTuple):
+    value: str  # Without quotes or brackets
+    start: int  # Offset of the first character, including quotes or brackets
+    end: int    # Offset after the last character
+    kind: str   # "unquoted", "quoted" or "bracket"
+
+class CMakeCommand(NamedTuple):
+    name: str
+    line: int
+    start: int
+    end: int
+    arguments: List[CMakeArgument]
+
+# Keywords taking a single value, for the functions downloading port sources
+SOURCE_FUNCTION_KEYWORDS: Dict[str, List[str]] = {
+    "vcpkg_from_github": ["OUT_SOURCE_PATH", "REPO", "REF", "SHA512", "HEAD_REF", "GITHUB_HOST", "AUTHORIZATION_TOKEN", "FILE_DISAMBIGUATOR"],
+    "vcpkg_from_git": ["OUT_SOURCE_PATH", "URL", "REF", "FETCH_REF", "HEAD_REF"],
+}
+# Keywords taking a list of values or no value
+SOURCE_FUNCTION_LIST_KEYWORDS: Dict[str, List[str]] = {
+    "vcpkg_from_github": ["PATCHES", "USE_TARBALL_API"],
+    "vcpkg_from_git": ["PATCHES", "LFS"],
+}
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_BRACKET_OPEN = re.compile(r"\[(=*)\[")
+
+def _skip_bracket(text: str, position: int) -> Optional[int]:
+    """If a bracket argument or comment starts at position, return the offset after it."""
+    match = _BRACKET_OPEN.match(text, position)
+    if not match:
+        return None
+    close = text.find(f"]{match.group(1)}]", match.end())
+    if close < 0:
+        raise ValueError(f"Unterminated bracket at offset {position}.")
+    return close + len(match.group(1)) + 2
+
+def _skip_space_and_comments(text: str, position: int) -> int:
+    while position < len(text):
+        if text[position].isspace():
+            position += 1
+        elif text[position] == "#":
+            end = _skip_bracket(text, position + 1)
+            if end is None:
+                end = text.find("\n", position)
+                end = len(text) if end < 0 else end
+            position = end
+        else:
+            break
+    return position
+
+def _parse_arguments(text: str, position: int) -> Tuple[List[CMakeArgument], int]:
+    """Parse the arguments after the opening parenthesis. Returns the arguments and the offset after ')'."""
+    arguments: List[CMakeArgument] = []
+    depth = 0
+    while True:
+        position = _skip_space_and_comments(text, position)
+        if position >= len(text):
+            raise ValueError("Unterminated command invocation.")
+        char = text[position]
+        if char == ")":
+            if depth == 0:
+                return arguments, position + 1
+            depth -= 1
+            position += 1
+        elif char == "(":
+            depth += 1
+            position += 1
+        elif char == '"':
+            end = position + 1
+            while end < len(text) and text[end] != '"':
+                end += 2 if text[end] == "\\" else 1
+            if end >= len(text):
+                raise ValueError(f"Unterminated quoted argument at offset {position}.")
+            arguments.append(CMakeArgument(text[position + 1:end], position, end + 1, "quoted"))
+            position = end + 1
+        elif char == "[" and _BRACKET_OPEN.match(text, position):
+            end = _skip_bracket(text, position)
+            opening = _BRACKET_OPEN.match(text, position).end()
+            closing = end - (opening - position)
+            value = text[opening:closing]
+            arguments.append(CMakeArgument(value[1:] if value.startswith("\n") else value, position, end, "bracket"))
+            position = end
+        else:
+            end = position
+            while end < len(text) and not text[end].isspace() and text[end] not in '()#"':
+                end += 2 if text[end] == "\\" else 1
+            arguments.append(CMakeArgument(text[position:end], position, end, "unquoted"))
+            position = end
+
+def parse_cmake_commands(text: str) -> List[CMakeCommand]:
+    """
+    Tokenize a CMake file into its command invocations.
+    Raises ValueError if the file is not valid CMake syntax.
+    """
+    commands: List[CMakeCommand] = []
+    position = 0
+    while True:
+        position = _skip_space_and_comments(text, position)
+        if position >= len(text):
+            return commands
+        match = _IDENTIFIER.match(text, position)
+        if not match:
+            raise ValueError(f"Expected a command name at line {text.count(chr(10), 0, position) + 1}.")
+        name_end = match.end()
+        open_paren = name_end
+        while open_paren < len(text) and text[open_paren] in " \t":
+            open_paren += 1
+        if open_paren >= len(text) or text[open_paren] != "(":
+            raise ValueError(f"Expected '(' after '{match.group()}' at line {text.count(chr(10), 0, position) + 1}.")
+        arguments, end = _parse_arguments(text, open_paren + 1)
+        commands.append(CMakeCommand(match.group(), text.count("\n", 0, position) + 1, position, end, arguments))
+        position = end
+
+def get_source_calls(text: str) -> List[Dict]:
+    """
+    Find every vcpkg_from_github and vcpkg_from_git call in a portfile.
+    Each call is returned as a JSON serializable dict:
+        {"function": ..., "line": ..., "arguments": {"REF": {"value": ..., "start": ..., "end": ...}, ...}}
+    Only the single value keywords are included in "arguments".
+    """
+    calls = []
+    for command in parse_cmake_commands(text):
+        function = command.name.lower()
+        if function not in SOURCE_FUNCTION_KEYWORDS:
+            continue
+        keywords = SOURCE_FUNCTION_KEYWORDS[function]
+        all_keywords = keywords + SOURCE_FUNCTION_LIST_KEYWORDS[function]
+        arguments: Dict[str, Dict] = {}
+        current: Optional[str] = None
+        for argument in command.arguments:
+            if argument.kind == "unquoted" and argument.value in all_keywords:
+                current = argument.value if argument.value in keywords else None
+            elif current is not None:
+                if current not in arguments:
+                    arguments[current] = {"value": argument.value, "start": argument.start, "end": argument.end}
+                current = None
+        calls.append({"function": function, "line": command.line, "arguments": arguments})
+    return calls
+
+def replace_spans(text: str, edits: List[Tuple[int, int, str]]) -> str:
+    """Replace (start, end, replacement) spans in text. The spans must not overlap."""
+    result = []
+    position = 0
+    for start, end, replacement in sorted(edits):
+        if start < position:
+            raise ValueError(f"Overlapping edits at offset {start}.")
+        result.append(text[position:start])
+        result.append(replacement)
+        position = end
+    result.append(text[position:])
+    return "".join(result)
+
+def set_source_arguments(text: str, call: Dict, values: Dict[str, str]) -> str:
+    """
+    Return text with the arguments of a call from get_source_calls replaced, e.g. {"REF": ..., "SHA512": ...}.
+    Raises KeyError if the call does not have one of the arguments.
+    """
+    edits = []
+    for keyword, value in values.items():
+        argument = call["arguments"][keyword]
+        edits.append((argument["start"], argument["end"], value))
+    return replace_spans(text, edits)
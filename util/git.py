@@ -0,0 +1,96 @@
+import hashlib
+import subprocess
+from typing import Optional, List, Dict, Tuple
+
+def read_git_objects(object_names: List[str]) -> Dict[str, Optional[bytes]]:
+    """
+    Read several objects from the local object database with a single 'git cat-file --batch' process.
+    Each name may be anything git accepts, e.g. '<tree>:portfile.cmake' or '<commit>:versions/baseline.json'.
+    Missing objects are returned as None.
+    """
+    unique_names = list(dict.fromkeys(object_names))
+    if not unique_names:
+        return {}
+
+    request = "".join(f"{name}\n" for name in unique_names).encode()
+    result = subprocess.run(["git", "cat-file", "--batch"], input=request, capture_output=True, check=True)
+
+    objects: Dict[str, Optional[bytes]] = {}
+    output = result.stdout
+    position = 0
+    for name in unique_names:
+        header_end = output.index(b"\n", position)
+        header = output[position:header_end].decode()
+        position = header_end + 1
+        if header.endswith(" missing") or header.endswith(" ambiguous"):
+            objects[name] = None
+            continue
+        size = int(header.split()[2])
+        objects[name] = output[position:position + size]
+        position += size + 1  # Content is followed by a newline
+    return objects
+
+def get_object_hashes(object_names: List[str]) -> Dict[str, Optional[str]]:
+    """Resolve several object names to their hashes with a single 'git cat-file --batch-check' process."""
+    unique_names = list(dict.fromkeys(object_names))
+    if not unique_names:
+        return {}
+
+    request = "".join(f"{name}\n" for name in unique_names).encode()
+    result = subprocess.run(["git", "cat-file", "--batch-check"], input=request, capture_output=True, check=True)
+    hashes: Dict[str, Optional[str]] = {}
+    for name, line in zip(unique_names, result.stdout.decode().splitlines()):
+        hashes[name] = None if line.endswith(" missing") or line.endswith(" ambiguous") else line.split()[0]
+    return hashes
+
+def get_tree_archive(tree_hash: str) -> bytes:
+    """Return an uncompressed tar archive with the content of a git tree."""
+    result = subprocess.run(["git", "archive", "--format=tar", tree_hash], capture_output=True, check=True)
+    return result.stdout
+
+def write_blob(content: bytes) -> str:
+    """Write a blob to the object database and return its hash."""
+    result = subprocess.run(["git", "hash-object", "-w", "--stdin"], input=content, capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+def list_tree(tree_hash: str) -> List[Tuple[str, str, str, str]]:
+    """List the entries of a git tree as (mode, type, hash, name) tuples."""
+    result = subprocess.run(["git", "ls-tree", "-z", tree_hash], capture_output=True, check=True)
+    entries = []
+    for line in result.stdout.decode().split("\0"):
+        if line:
+            info, name = line.split("\t", 1)
+            mode, object_type, object_hash = info.split()
+            entries.append((mode, object_type, object_hash, name))
+    return entries
+
+def make_tree(entries: List[Tuple[str, str, str, str]]) -> str:
+    """Write a git tree from (mode, type, hash, name) tuples and return its hash."""
+    request = "".join(f"{mode} {object_type} {object_hash}\t{name}\0" for mode, object_type, object_hash, name in entries)
+    result = subprocess.run(["git", "mktree", "-z"], input=request.encode(), capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+def replace_subtree(root_tree: str, path: str, subtree: str) -> str:
+    """Return the hash of a copy of root_tree where the directory at path (e.g. 'ports/signal') is replaced by subtree."""
+    name, _, rest = path.partition("/")
+    root_entries = list_tree(root_tree)
+    entries = [entry for entry in root_entries if entry[3] != name]
+    if rest:
+        current = next((entry[2] for entry in root_entries if entry[3] == name and entry[1] == "tree"), None)
+        if current is None:
+            current = make_tree([])
+        subtree = replace_subtree(current, rest, subtree)
+    entries.append(("040000", "tree", subtree, name))
+    return make_tree(entries)
+
+def get_blob_hash(content: bytes) -> str:
+    """Compute the git blob hash of some content, without writing it to the object database."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+def get_tree_hash(entries: List[Tuple[str, str, str, str]]) -> str:
+    """Compute the hash of a git tree from (mode, type, hash, name) tuples, without writing it to the object database."""
+    # Git sorts tree entries by name, with directories compared as if they end with '/'
+    ordered = sorted(entries, key=lambda entry: entry[3].encode() + (b"/" if entry[1] == "tree" else b""))
+    content = b"".join(b"%s %s\0" % (mode.lstrip("0").encode(), name.encode()) + bytes.fromhex(object_hash)
+                       for mode, _, object_hash, name in ordered)
+    return hashlib.sha1(b"tree %d\0" % len(content) + content).hexdigest()
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import queue
+import threading
+from typing import Optional, List, Dict, Tuple, BinaryIO
+
+# Large buffers keep the number of reads and hash updates low, a few of them let reading and hashing overlap
+BUFFER_SIZE = 1024 * 1024
+BUFFER_COUNT = 4
+
+def _fill_buffer(stream: BinaryIO, view: memoryview) -> int:
+    """Read into view until it is full or the stream ends. Returns the number of bytes read."""
+    filled = 0
+    while filled < len(view):
+        count = stream.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+def hash_stream(stream: BinaryIO, size: Optional[int] = None, git_blob: bool = False) -> Dict:
+    """
+    Compute the SHA512, SHA256 and size of a stream in one pass.
+    The stream is read into preallocated buffers on the calling thread while every digest runs on its own
+    thread, hashlib releases the GIL so reading and all digests run in parallel. A buffer is only reused
+    once every digest has processed it.
+    If git_blob is set and the size is known up front, the git blob hash is computed as well.
+    Returns a dict with "sha512", "sha256", "size" and "git-blob" (None when not computed).
+    """
+    digests = [hashlib.sha512(), hashlib.sha256()]
+    git_blob_digest = None
+    if git_blob and size is not None:
+        git_blob_digest = hashlib.sha1(b"blob %d\0" % size)
+        digests.append(git_blob_digest)
+
+    buffers = [bytearray(BUFFER_SIZE) for _ in range(BUFFER_COUNT)]
+    free_buffers: "queue.Queue[int]" = queue.Queue()
+    for index in range(BUFFER_COUNT):
+        free_buffers.put(index)
+    # Number of digests still to process each buffer
+    pending = [0] * BUFFER_COUNT
+    pending_lock = threading.Lock()
+
+    def hash_buffers(digest, filled_buffers: "queue.Queue[Optional[Tuple[int, int]]]") -> None:
+        while True:
+            item = filled_buffers.get()
+            if item is None:
+                return
+            index, length = item
+            with memoryview(buffers[index]) as view:
+                digest.update(view[:length])
+            with pending_lock:
+                pending[index] -= 1
+                done = pending[index] == 0
+            if done:
+                free_buffers.put(index)
+
+    queues: List["queue.Queue[Optional[Tuple[int, int]]]"] = [queue.Queue() for _ in digests]
+    hashers = [threading.Thread(target=hash_buffers, args=(digest, filled_buffers), daemon=True) for digest, filled_buffers in zip(digests, queues)]
+    for hasher in hashers:
+        hasher.start()
+    total = 0
+    try:
+        while True:
+            index = free_buffers.get()
+            with memoryview(buffers[index]) as view:
+                length = _fill_buffer(stream, view)
+            if not length:
+                break
+            total += length
+            pending[index] = len(digests)
+            for filled_buffers in queues:
+                filled_buffers.put((index, length))
+    finally:
+        for filled_buffers in queues:
+            filled_buffers.put(None)
+        for hasher in hashers:
+            hasher.join()
+
+    if size is not None and total != size:
+        raise IOError(f"Expected {size} bytes but read {total}.")
+    return {
+        "sha512": digests[0].hexdigest(),
+        "sha256": digests[1].hexdigest(),
+        "size": total,
+        "git-blob": git_blob_digest.hexdigest() if git_blob_digest else None,
+    }
+
+def hash_file(file_path: str, git_blob: bool = False) -> Dict:
+    """Compute the digests of a file, see hash_stream."""
+    with open(file_path, "rb", buffering=0) as f:
+        return hash_stream(f, os.fstat(f.fileno()).st_size, git_blob)
+
+def hash_response(response, git_blob: bool = False) -> Dict:
+    """
+    Compute the digests of a streamed requests response while it is downloaded, see hash_stream.
+    Without a Content-Encoding, the buffers are filled straight from the underlying http.client response:
+    urllib3's readinto reads into a new bytes object and copies it, for every buffer. Encoded content is
+    decoded by urllib3, which creates new bytes objects anyway.
+    """
+    raw = response.raw
+    if response.headers.get("Content-Encoding"):
+        raw.decode_content = True
+        return hash_stream(raw, None, git_blob)
+    content_length = response.headers.get("Content-Length")
+    stream = getattr(raw, "_fp", None)
+    if stream is None or not hasattr(stream, "readinto"):
+        stream = raw
+    return hash_stream(stream, int(content_length) if content_length else None, git_blob)
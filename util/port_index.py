@@ -0,0 +1,53 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict
+
+from util.cmake import get_source_calls
+
+# Metadata of parsed portfiles, keyed by the git blob hash of the portfile content
+INDEX_FILE = ".port-index.json"
+# Bump when the stored metadata changes, to invalidate old index files
+INDEX_VERSION = 1
+# Parsing is fast, only start worker processes when there is a lot to parse
+PARALLEL_THRESHOLD = 64
+
+def parse_portfile(content: bytes) -> Optional[List[Dict]]:
+    """Return the source calls of a portfile, or None if it can not be parsed."""
+    try:
+        return get_source_calls(content.decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def load_index(index_file: str = INDEX_FILE) -> Dict[str, Optional[List[Dict]]]:
+    if not os.path.isfile(index_file):
+        return {}
+    with open(index_file, "r") as f:
+        data = json.load(f)
+    if data.get("version") != INDEX_VERSION:
+        return {}
+    return data.get("portfiles", {})
+
+def save_index(index: Dict[str, Optional[List[Dict]]], index_file: str = INDEX_FILE) -> None:
+    temp_file = f"{index_file}.{os.getpid()}.tmp"
+    with open(temp_file, "w", newline='\n') as f:
+        json.dump({"version": INDEX_VERSION, "portfiles": index}, f, sort_keys=True)
+    os.replace(temp_file, index_file)
+
+def update_index(index: Dict[str, Optional[List[Dict]]], portfiles: Dict[str, bytes], jobs: Optional[int] = None) -> int:
+    """
+    Parse the portfiles, keyed by blob hash, that are not in the index yet.
+    Returns the number of parsed portfiles.
+    """
+    missing = [(blob_hash, content) for blob_hash, content in portfiles.items() if blob_hash not in index]
+    if len(missing) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(parse_portfile, [content for _, content in missing], chunksize=16))
+    else:
+        results = [parse_portfile(content) for _, content in missing]
+
+    for (blob_hash, _), calls in zip(missing, results):
+        if calls is None:
+            print(f"Warning: Failed to parse portfile with blob hash {blob_hash}.")
+        index[blob_hash] = calls
+    return len(missing)
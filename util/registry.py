@@ -6,31 +6,48 @@ import subprocess
 from typing import Optional
 
 from util.util import get_sha512_from_github, format_vcpkg_manifest, run_vcpkg_add_new_ports
+from util.cmake import get_source_calls, set_source_arguments
 
-def replace_hash_in_portfile(portname: str, new_ref: str, new_sha512: str) -> None:
+def find_github_source_call(portfile_path: str, portfile: str) -> Optional[dict]:
+    """Return the only vcpkg_from_github call in a portfile, or None if there is not exactly one."""
+    try:
+        calls = [call for call in get_source_calls(portfile) if call["function"] == "vcpkg_from_github"]
+    except ValueError as e:
+        print(f"Error parsing '{portfile_path}': {e}")
+        return None
+    if len(calls) != 1:
+        print(f"Error: Expected exactly one vcpkg_from_github call in '{portfile_path}', found {len(calls)}.")
+        return None
+    return calls[0]
+
+def replace_hash_in_portfile(portname: str, new_ref: str, new_sha512: str) -> bool:
+    """Replace REF and SHA512 of the vcpkg_from_github call in a portfile. Returns False if the portfile was not changed."""
     portfile_path = os.path.join("ports", portname, "portfile.cmake")
     vcpkg_json_path = os.path.join("ports", portname, "vcpkg.json")
 
     if not os.path.isfile(portfile_path):
         print(f"Error: 'portfile.cmake' not found in the '{portname}' directory.")
-        return
+        return False
 
     with open(portfile_path, "r") as f:
-        lines = f.readlines()
+        portfile = f.read()
+
+    source_call = find_github_source_call(portfile_path, portfile)
+    if source_call is None:
+        return False
+    if "REF" not in source_call["arguments"] or "SHA512" not in source_call["arguments"]:
+        print(f"Error: REF or SHA512 not found in the vcpkg_from_github call in '{portfile_path}'.")
+        return False
 
     with open(portfile_path, "w", newline='\n') as f:
-        for line in lines:
-            if line.strip().startswith("REF"):
-                line = f"    REF {new_ref}\n"
-            elif line.strip().startswith("SHA512"):
-                line = f"    SHA512 {new_sha512}\n"
-            f.write(line)
+        f.write(set_source_arguments(portfile, source_call, {"REF": new_ref, "SHA512": new_sha512}))
 
     print(f"Updated 'portfile.cmake' with REF: {new_ref} and SHA512: {new_sha512}.")
 
     # Format the vcpkg.json file after any modifications
     if not format_vcpkg_manifest(vcpkg_json_path):
         print(f"Warning: Failed to format 'vcpkg.json' for port '{portname}'. Please check the file manually.")
+    return True
 
 def check_staged_files() -> None:
     try:
@@ -162,16 +179,15 @@ def run(args: argparse.Namespace) -> None:
         print(f"Error: 'portfile.cmake' not found in the '{args.portname}' directory.")
         return
 
-    repo_name: Optional[str] = None
-    with open(portfile_path, "r") as portfile:
-        for line in portfile:
-            if "REPO" in line:
-                repo_name = line.split()[1]
-                print(f"Found REPO: {repo_name}")
-                break
-        else:
-            print("Error: REPO not found in 'portfile.cmake'.")
-            return
+    with open(portfile_path, "r") as f:
+        source_call = find_github_source_call(portfile_path, f.read())
+    if source_call is None:
+        return
+    if not all(keyword in source_call["arguments"] for keyword in ["REPO", "REF", "SHA512"]):
+        print("Error: REPO, REF or SHA512 not found in 'portfile.cmake'.")
+        return
+    repo_name = source_call["arguments"]["REPO"]["value"]
+    print(f"Found REPO: {repo_name}")
 
     hash_value = get_sha512_from_github(repo_name, args.git_hash)
     if not hash_value:
@@ -180,7 +196,9 @@ def run(args: argparse.Namespace) -> None:
 
     proceed = input("Do you want to update the port? (yes/no): ").strip().lower()
     if proceed == "yes":
-        replace_hash_in_portfile(args.portname, args.git_hash, hash_value)
+        if not replace_hash_in_portfile(args.portname, args.git_hash, hash_value):
+            print("Aborted. The portfile was not updated, the versions files are unchanged.")
+            return
         remove_highest_version(args.portname)
         print("SUCCESS")
     else:
@@ -2,10 +2,13 @@ import json
 import subprocess
 import os
 import platform
-import hashlib
+import tempfile
 import requests
+import urllib3
 from typing import Optional, List, Tuple, Dict
 
+from util.hashing import hash_file, hash_response
+
 def get_vcpkg_executable() -> str:
     vcpkg_root = os.environ.get("VCPKG_ROOT")
     if not vcpkg_root:
@@ -34,19 +37,24 @@ def format_vcpkg_manifest(vcpkg_json_path: str) -> bool:
         print(f"Unexpected error while formatting manifest {vcpkg_json_path}: {e}")
         return False
 
-def get_sha512_from_github(repo_name: str, git_hash: str) -> str:
+def get_digests_from_github(repo_name: str, git_hash: str) -> Optional[Dict]:
+    """Get the SHA512, SHA256 and size of a GitHub archive, or None on failure."""
     url = f"https://github.com/{repo_name}/archive/{git_hash}.tar.gz"
     print(f"Constructed URL: {url}")
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        sha512_hash = hashlib.sha512()
-        for chunk in response.iter_content(chunk_size=8192):
-            sha512_hash.update(chunk)
-        return sha512_hash.hexdigest()
-    except requests.RequestException as e:
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            return hash_response(response)
+    except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
         print(f"Error fetching URL: {e}")
-        return ""
+        return None
+
+def get_sha512_from_github(repo_name: str, git_hash: str) -> str:
+    digests = get_digests_from_github(repo_name, git_hash)
+    return digests["sha512"] if digests else ""
+
+def get_sha512_from_file(file_path: str) -> str:
+    return hash_file(file_path)["sha512"]
 
 def run_vcpkg_add_new_ports() -> None:
     try:
@@ -91,6 +99,21 @@ def get_or_create_baseline() -> Tuple[str, Dict]:
     with open(baseline_file, "r") as f:
         return baseline_file, json.load(f)
     
+def get_versions_file_path(portname: str) -> str:
+    """Get the path of a port's versions file, relative to the registry root. Also valid as a git path."""
+    return f"versions/{portname[0]}-/{portname}.json"
+
+def render_vcpkg_json(vcpkg_data: Dict) -> Optional[str]:
+    """Return the content of a port manifest formatted by vcpkg, without touching the port."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        vcpkg_json_path = os.path.join(temp_dir, "vcpkg.json")
+        with open(vcpkg_json_path, "w", newline='\n') as f:
+            json.dump(vcpkg_data, f, indent=2)
+        if not format_vcpkg_manifest(vcpkg_json_path):
+            return None
+        with open(vcpkg_json_path, "rb") as f:
+            return f.read().decode()
+
 def get_git_tree_hash(port_path: str, commit_hash: str) -> Optional[str]:
     """Get the git-tree hash for a specific commit in the local repository for a specific port folder."""
     try:
@@ -106,4 +129,17 @@ def get_git_tree_hash(port_path: str, commit_hash: str) -> Optional[str]:
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
         print(f"Error getting git-tree hash for commit {commit_hash} in {port_path}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def load_versions_files(versions_dir: str = "versions") -> Dict[str, Dict]:
+    """Load all versions files in the registry, keyed by port name."""
+    versions: Dict[str, Dict] = {}
+    for entry in sorted(os.listdir(versions_dir)):
+        prefix_dir = os.path.join(versions_dir, entry)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for file in sorted(os.listdir(prefix_dir)):
+            if file.endswith(".json"):
+                with open(os.path.join(prefix_dir, file), "r") as f:
+                    versions[file[:-len(".json")]] = json.load(f)
+    return versions